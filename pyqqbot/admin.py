@@ -0,0 +1,148 @@
+"""
+本地管理接口，在不断开网关连接的情况下对运行中的机器人进行性能分析
+
+    curl -o out.folded 'http://127.0.0.1:9465/debug/profile?seconds=30'
+    curl -o out.txt 'http://127.0.0.1:9465/debug/profile?mode=cprofile&seconds=30'
+    curl -X POST http://127.0.0.1:9465/debug/heap/start
+    curl http://127.0.0.1:9465/debug/heap
+"""
+from typing import Any, Optional, Union
+
+import functools
+import threading
+import asyncio
+
+from aiohttp import web
+
+from .profiling import StackSampler, FunctionProfiler, HeapTracker, handler_ranges
+from .logger import Network
+
+
+class AdminServer:
+    """
+    管理接口：
+    GET  /debug/profile?mode=sample|cprofile&seconds=10  分析一段时间后返回结果
+    POST /debug/profile/start?mode=sample|cprofile       开始分析
+    POST /debug/profile/stop                             停止分析并返回结果
+    POST /debug/heap/start?frames=32                     开始记录内存分配
+    GET  /debug/heap                                     与上一次快照对比
+    POST /debug/heap/stop                                停止记录内存分配
+    """
+    host: str
+    port: int
+
+    def __init__(self, client: Any, host: str = '127.0.0.1', port: int = 9465):
+        """
+        :param client: QQBot
+        :param host: 管理接口可以读取进程内的任意数据，请勿监听公网地址
+        :param port:
+        """
+        self.client = client
+        self.host = host
+        self.port = port
+
+        self.heap = HeapTracker(client)
+
+        self._profiler: Optional[Union[StackSampler, FunctionProfiler]] = None
+        self._loop_thread: Optional[int] = None
+        self._runner: Optional[web.AppRunner] = None
+
+        self.app = web.Application()
+        self.app.add_routes([
+            web.get('/debug/profile', self._profile),
+            web.post('/debug/profile/start', self._profile_start),
+            web.post('/debug/profile/stop', self._profile_stop),
+            web.get('/debug/heap', self._heap),
+            web.post('/debug/heap/start', self._heap_start),
+            web.post('/debug/heap/stop', self._heap_stop),
+        ])
+
+    async def start(self):
+        self._loop_thread = threading.get_ident()
+
+        self._runner = web.AppRunner(self.app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+        Network.info(f'管理接口已启动: http://{self.host}:{self.port}/debug')
+
+    async def stop(self):
+        if self._profiler is not None:
+            self._profiler.stop()
+            self._profiler = None
+
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    def start_profile(self, mode: str = 'sample', interval: float = 0.005):
+        """
+        开始分析事件循环线程
+        :param mode: sample 为采样分析，输出折叠栈；cprofile 为确定性分析，输出 pstats 报告，开销较大
+        :param interval: 采样间隔（秒）
+        :return:
+        """
+        if self._profiler is not None:
+            raise RuntimeError('已有正在进行的分析')
+
+        if mode == 'sample':
+            self._profiler = StackSampler(self._loop_thread, interval)
+        elif mode == 'cprofile':
+            self._profiler = FunctionProfiler()
+        else:
+            raise ValueError(f'未知分析模式: {mode}')
+
+        self._profiler.start()
+        Network.info(f'开始性能分析: {mode}')
+
+    def stop_profile(self) -> str:
+        if self._profiler is None:
+            raise RuntimeError('没有正在进行的分析')
+
+        profiler, self._profiler = self._profiler, None
+        Network.info('性能分析已停止')
+        return profiler.stop()
+
+    async def _profile(self, request: web.Request):
+        try:
+            seconds = float(request.query.get('seconds', 10))
+            self.start_profile(request.query.get('mode', 'sample'), float(request.query.get('interval', 0.005)))
+        except (RuntimeError, ValueError) as e:
+            return web.Response(status=409, text=str(e))
+
+        try:
+            await asyncio.sleep(seconds)
+        finally:
+            result = self.stop_profile()
+
+        return web.Response(text=result)
+
+    async def _profile_start(self, request: web.Request):
+        try:
+            self.start_profile(request.query.get('mode', 'sample'), float(request.query.get('interval', 0.005)))
+        except (RuntimeError, ValueError) as e:
+            return web.Response(status=409, text=str(e))
+
+        return web.Response(text='ok')
+
+    async def _profile_stop(self, request: web.Request):
+        try:
+            return web.Response(text=self.stop_profile())
+        except RuntimeError as e:
+            return web.Response(status=409, text=str(e))
+
+    async def _heap(self, request: web.Request):
+        if not self.heap.tracing:
+            return web.Response(status=409, text='请先调用 /debug/heap/start')
+
+        # 监听器列表在事件循环中读取，耗时的快照与对比在线程中进行，不阻塞心跳
+        snapshot = functools.partial(self.heap.snapshot, int(request.query.get('limit', 30)), handler_ranges(self.client))
+        return web.json_response(await asyncio.get_running_loop().run_in_executor(None, snapshot))
+
+    async def _heap_start(self, request: web.Request):
+        self.heap.frames = int(request.query.get('frames', self.heap.frames))
+        await asyncio.get_running_loop().run_in_executor(None, self.heap.start)
+        return web.Response(text='ok')
+
+    async def _heap_stop(self, request: web.Request):
+        self.heap.stop()
+        return web.Response(text='ok')
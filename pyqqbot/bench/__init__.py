@@ -0,0 +1,95 @@
+"""
+pyqqbot 性能基准测试
+"""
+from typing import Awaitable, Callable, List
+
+import time
+
+
+def measure(func: Callable[[], object], number: int = 10000) -> float:
+    """
+    重复执行 func，返回平均每次耗时（纳秒）
+    :param func:
+    :param number:
+    :return:
+    """
+    for _ in range(min(number // 10, 1000)):
+        func()
+
+    start = time.perf_counter_ns()
+    for _ in range(number):
+        func()
+
+    return (time.perf_counter_ns() - start) / number
+
+
+def sample(func: Callable[[], object], number: int = 10000) -> List[int]:
+    """
+    重复执行 func，返回每次耗时（纳秒），用于统计延迟分位数
+    :param func:
+    :param number:
+    :return:
+    """
+    for _ in range(min(number // 10, 1000)):
+        func()
+
+    clock = time.perf_counter_ns
+    samples = []
+    for _ in range(number):
+        start = clock()
+        func()
+        samples.append(clock() - start)
+
+    return samples
+
+
+async def sample_async(func: Callable[[], Awaitable[object]], number: int = 1000) -> List[int]:
+    """
+    sample 的异步版本
+    :param func:
+    :param number:
+    :return:
+    """
+    for _ in range(min(number // 10, 100)):
+        await func()
+
+    clock = time.perf_counter_ns
+    samples = []
+    for _ in range(number):
+        start = clock()
+        await func()
+        samples.append(clock() - start)
+
+    return samples
+
+
+def percentile(samples: List[int], q: float) -> float:
+    """
+    计算分位数（最近秩法）
+    :param samples: 已排序的样本
+    :param q: 0 ~ 100
+    :return:
+    """
+    if not samples:
+        return 0.0
+
+    return samples[min(len(samples) - 1, max(0, round(q / 100 * len(samples)) - 1))]
+
+
+def summarize(samples: List[int], items: int = 1) -> dict:
+    """
+    汇总耗时样本
+    :param samples: 每次耗时（纳秒）
+    :param items: 每次处理的条目数，用于计算吞吐量
+    :return: 吞吐量（条目/秒）与平均、p50、p99 延迟（微秒）
+    """
+    samples = sorted(samples)
+    total = sum(samples)
+
+    return {
+        'count': len(samples),
+        'throughput': len(samples) * items / total * 1e9 if total else 0.0,
+        'mean_us': total / len(samples) / 1000 if samples else 0.0,
+        'p50_us': percentile(samples, 50) / 1000,
+        'p99_us': percentile(samples, 99) / 1000,
+    }
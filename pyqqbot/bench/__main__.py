@@ -0,0 +1,254 @@
+"""
+完整的基准测试套件，结果以 JSON 输出，便于对比不同版本
+
+    python -m pyqqbot.bench --output before.json
+    python -m pyqqbot.bench --compare before.json
+
+覆盖网关帧解码、各事件模型构造、event_loop 分发开销、消息解析与序列化，
+以及经由本地模拟服务器的消息发送与富媒体上传
+"""
+from itertools import count
+from typing import Callable, Dict, List, Optional
+
+import argparse
+import asyncio
+import platform
+import socket
+import time
+import json
+import sys
+
+import aiohttp
+import logbook
+
+from ..client import QQBot
+from ..entities import GroupMessage
+from ..entities.components import Image
+from ..entities.components.parser import MessageParser
+from ..entities.trusted import construct
+from ..event.enums import EVENT_CLASS
+from ..media import MediaCache
+from ..models.ws import Load, Frame
+from ..ratelimit import RateLimiter
+from ..testing.server import FakeServer
+from . import sample, sample_async, summarize
+from .frames import record_frames
+from .parser import long_message
+from .samples import EVENTS, GROUP_AT_MESSAGE_CREATE, AT_MESSAGE_CREATE
+
+# 上传测试使用的文件大小
+UPLOAD_SIZE = 256 * 1024
+
+
+def cycle(items: list) -> Callable[[], object]:
+    """
+    依次循环返回 items 中的元素
+    """
+    state = {'i': 0}
+
+    def next_item():
+        i = state['i'] = (state['i'] + 1) % len(items)
+        return items[i]
+
+    return next_item
+
+
+def bench_frames(scale: float) -> Dict[str, dict]:
+    frames = record_frames()
+    results = {}
+
+    for name, frame_class in (('pydantic', Load), ('fast', Frame)):
+        raw = cycle(frames)
+        results[f'frames.decode.{name}'] = summarize(
+            sample(lambda: frame_class.parse_raw(raw()), int(20000 * scale))
+        )
+
+    return results
+
+
+def bench_models(scale: float) -> Dict[str, dict]:
+    results = {}
+
+    for name, data in EVENTS.items():
+        model = EVENT_CLASS[name]
+        results[f'models.{name}.strict'] = summarize(
+            sample(lambda: model(client=None, **data), int(2000 * scale))
+        )
+        results[f'models.{name}.trusted'] = summarize(
+            sample(lambda: construct(model, data, client=None), int(2000 * scale))
+        )
+
+    return results
+
+
+def bench_parser(scale: float) -> Dict[str, dict]:
+    results = {}
+
+    for name, message in (('short', AT_MESSAGE_CREATE), ('long', long_message())):
+        components = MessageParser(message).parse_dict()
+        results[f'parser.parse.{name}'] = summarize(
+            sample(lambda: MessageParser(message).parse_dict(), int(2000 * scale))
+        )
+        results[f'parser.serialize.{name}'] = summarize(
+            sample(lambda: MessageParser.to_dict(components), int(2000 * scale))
+        )
+
+    return results
+
+
+async def bench_dispatch(scale: float) -> Dict[str, dict]:
+    """
+    从 register_event 到监听器开始执行的耗时，每次只有一个事件在途，结果即为分发本身的开销
+    """
+    bot = QQBot(0, '')
+    # 事件 ID 不能重复，否则会被去重索引丢弃
+    payloads = cycle([{**GROUP_AT_MESSAGE_CREATE, 'id': str(i)} for i in range(1000)])
+    sequence = count()
+    waiter: Optional[asyncio.Future] = None
+
+    async def handler(message: GroupMessage):
+        waiter.set_result(message)
+
+    bot.add_event_handler('GROUP_AT_MESSAGE_CREATE', handler)
+    bot.start_consumers()
+
+    async def dispatch():
+        nonlocal waiter
+        waiter = asyncio.get_running_loop().create_future()
+        s = next(sequence)
+        await bot.register_event(Frame(op=0, s=s, t='GROUP_AT_MESSAGE_CREATE', id=str(s), d=payloads()))
+        await waiter
+
+    try:
+        return {'dispatch.event_loop': summarize(await sample_async(dispatch, int(20000 * scale)))}
+    finally:
+        await bot.close()
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+async def bench_send(scale: float) -> Dict[str, dict]:
+    """
+    经由本地模拟服务器发送消息，不限流，结果包含本机回环网络的耗时
+    """
+    server = FakeServer(port=free_port())
+    await server.start()
+
+    bot = QQBot(0, '', openapi_url=server.url, token_url=server.token_url,
+                rate_limiter=RateLimiter(global_rate=None, target_rate=None))
+    bot._session = aiohttp.ClientSession()
+    bot.http = bot._create_http_client()
+
+    try:
+        result = await bot._get_app_access_token()
+        bot._access_token = bot.http._access_token = f'QQBot {result.access_token}'
+
+        source = GroupMessage(client=bot, **GROUP_AT_MESSAGE_CREATE)
+        image = Image(filename='a.png', file=bytes(range(256)) * (UPLOAD_SIZE // 256))
+        number = int(500 * scale)
+
+        results = {
+            'send.text': summarize(await sample_async(lambda: bot.send_group_message(source, '今日运势'), number)),
+        }
+
+        # 缓存容量为 0 时每次发送都会重新上传
+        bot.media_cache = MediaCache(max_entries=0)
+        results['send.image.upload'] = summarize(
+            await sample_async(lambda: bot.send_group_message(source, image), number)
+        )
+        results['send.image.upload']['bytes_per_sec'] = results['send.image.upload']['throughput'] * UPLOAD_SIZE
+
+        bot.media_cache = MediaCache()
+        results['send.image.cached'] = summarize(
+            await sample_async(lambda: bot.send_group_message(source, image), number)
+        )
+
+        return results
+    finally:
+        await bot._session.close()
+        await server.stop()
+
+
+SUITES = {
+    'frames': bench_frames,
+    'models': bench_models,
+    'parser': bench_parser,
+    'dispatch': bench_dispatch,
+    'send': bench_send,
+}
+
+
+def environment() -> dict:
+    try:
+        from importlib.metadata import version
+        package = version('pyqqbot')
+    except Exception:
+        package = None
+
+    return {
+        'pyqqbot': package,
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'platform': platform.platform(),
+        'time': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+    }
+
+
+def compare(results: Dict[str, dict], baseline: Dict[str, dict]):
+    """
+    输出与基准结果的吞吐量与 p99 对比
+    """
+    print(f'{"benchmark":<56} {"throughput":>12} {"p99":>10}', file=sys.stderr)
+    for name, result in results.items():
+        base = baseline.get(name)
+        if base is None or not base['throughput'] or not result['p99_us']:
+            continue
+
+        print(
+            f'{name:<56} {result["throughput"] / base["throughput"]:>11.2f}x '
+            f'{base["p99_us"] / result["p99_us"]:>9.2f}x',
+            file=sys.stderr,
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description='pyqqbot 基准测试')
+    parser.add_argument('suites', nargs='*', metavar='suite', help=f'要运行的测试（{", ".join(SUITES)}），默认全部运行')
+    parser.add_argument('--scale', type=float, default=1.0, help='迭代次数倍数')
+    parser.add_argument('--output', help='结果输出文件，默认输出到标准输出')
+    parser.add_argument('--compare', help='与之前保存的结果对比，对比结果输出到标准错误')
+    args = parser.parse_args()
+
+    unknown = set(args.suites) - set(SUITES)
+    if unknown:
+        parser.error(f'未知测试: {", ".join(sorted(unknown))}')
+
+    results = {}
+    # 日志默认输出到标准输出，这里只保留警告以上的日志，避免混入结果
+    with logbook.NullHandler(filter=lambda record, handler: record.level < logbook.WARNING).applicationbound():
+        for name in args.suites or SUITES:
+            result = SUITES[name](args.scale)
+            if asyncio.iscoroutine(result):
+                result = asyncio.run(result)
+            results.update(result)
+
+    report = {'environment': environment(), 'results': results}
+    output = json.dumps(report, indent=2, ensure_ascii=False)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            compare(results, json.load(f)['results'])
+
+
+if __name__ == '__main__':
+    main()
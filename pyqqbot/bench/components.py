@@ -0,0 +1,83 @@
+"""
+消息组件基准测试，对比 __slots__ 组件与等价的 pydantic 模型的构造耗时与内存占用
+
+    python -m pyqqbot.bench.components
+"""
+from pydantic import BaseModel, validator
+from typing import Optional
+
+import tracemalloc
+
+from ..entities.components import Plain, At, Image, AttachmentType
+from . import measure
+
+COUNT = 10000
+
+
+class PydanticPlain(BaseModel):
+    content: str
+
+
+class PydanticAt(BaseModel):
+    id: str
+
+
+class PydanticImage(BaseModel):
+    id: Optional[str]
+    content_type: Optional[str]
+    filename: str
+    height: Optional[int]
+    width: Optional[int]
+    size: Optional[int]
+    url: Optional[str]
+
+    file: Optional[bytes]
+    path: Optional[str]
+    type: Optional[AttachmentType] = AttachmentType.IMAGE
+
+    @validator('url')
+    def url_validator(cls, v):
+        if not v.startswith('https://') and not v.startswith('http://'):
+            return 'https://' + v
+        return v
+
+
+def build_slots():
+    return [
+        (Plain('今日运势'), At('1234567890'), Image(filename='a.png', url='multimedia.nt.qq.com.cn/a.png'))
+        for _ in range(COUNT)
+    ]
+
+
+def build_pydantic():
+    return [
+        (
+            PydanticPlain(content='今日运势'),
+            PydanticAt(id='1234567890'),
+            PydanticImage(filename='a.png', url='multimedia.nt.qq.com.cn/a.png'),
+        )
+        for _ in range(COUNT)
+    ]
+
+
+def memory(build) -> float:
+    tracemalloc.start()
+    components = build()
+    size, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del components
+
+    return size / COUNT
+
+
+def main():
+    for name, build in (('pydantic', build_pydantic), ('slots', build_slots)):
+        elapsed = measure(build, 20)
+        print(
+            f'{name:>8}: {COUNT * 3 / elapsed * 1e9:,.0f} components/sec, '
+            f'{memory(build):.0f} bytes per (Plain, At, Image)'
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+"""
+事件分发开销基准测试，对比逐事件解析签名与预编译注入计划
+
+    python -m pyqqbot.bench.dispatch
+"""
+import functools
+
+from ..client import QQBot
+from ..entities import GroupMessage
+from ..event.enums import EVENT_CLASS, Event
+from ..misc import argument_signature
+from . import measure
+from .samples import GROUP_AT_MESSAGE_CREATE
+
+HANDLERS = 10
+
+
+async def handler(bot: QQBot, message: GroupMessage):
+    pass
+
+
+def legacy_dispatch(bot: QQBot, event: Event):
+    """
+    优化前的分发流程：每个事件都重新生成注解映射并解析监听器签名
+    """
+    def wrapper(name, event_context):
+        if name != event_context.name:
+            raise ValueError("cannot look up a non-listened event.")
+
+        return event_context.body
+
+    place_annotation = {
+        **bot.get_annotations_mapping(),
+        **{
+            event_class: functools.partial(wrapper, event_name)
+            for event_name, event_class in EVENT_CLASS.items()
+        },
+    }
+
+    for callback in bot.event.get(event.name, []):
+        call_params = {}
+
+        for name, annotation, default in argument_signature(callback):
+            if annotation in place_annotation:
+                call_params[name] = place_annotation[annotation](event)
+
+        callback(**call_params).close()
+
+
+def planned_dispatch(bot: QQBot, event: Event):
+    """
+    当前的分发流程：直接调用注册时生成的注入计划
+    """
+    for callback, injectors, name in bot._handlers.get(event.name, ()):
+        callback(**{name: inject(event) for name, inject in injectors}).close()
+
+
+def main():
+    bot = QQBot(0, '')
+    for _ in range(HANDLERS):
+        bot.add_event_handler('GROUP_AT_MESSAGE_CREATE', handler)
+
+    event = Event(
+        name='GROUP_AT_MESSAGE_CREATE',
+        body=GroupMessage(client=bot, **GROUP_AT_MESSAGE_CREATE),
+    )
+
+    before = measure(lambda: legacy_dispatch(bot, event))
+    after = measure(lambda: planned_dispatch(bot, event))
+
+    print(f'{HANDLERS} handlers per event')
+    print(f'before: {before / 1000:.2f} us/event')
+    print(f'after:  {after / 1000:.2f} us/event ({before / after:.1f}x)')
+
+
+if __name__ == '__main__':
+    main()
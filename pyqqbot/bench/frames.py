@@ -0,0 +1,82 @@
+"""
+网关帧解码基准测试，对比 pydantic 解析与快速解码
+
+    python -m pyqqbot.bench.frames
+"""
+from typing import List
+
+import json
+import time
+import tracemalloc
+
+from ..event.enums import EVENT_CLASS
+from ..models.ws import Load, Frame
+from .samples import EVENTS
+
+
+def record_frames() -> List[str]:
+    """
+    根据事件样本生成网关帧
+    """
+    return [
+        json.dumps({'op': 0, 's': s, 't': name, 'id': f'{name}:{s}', 'd': data}, ensure_ascii=False)
+        for s, (name, data) in enumerate(EVENTS.items(), start=1)
+    ]
+
+
+def decode(frame_class, frames: List[str]):
+    """
+    解码网关帧并构造事件模型
+    """
+    result = []
+
+    for raw in frames:
+        load = frame_class.parse_raw(raw)
+        result.append(EVENT_CLASS[load.t](client=None, **load.d))
+
+    return result
+
+
+def run(frame_class, frames: List[str], number: int = 200) -> dict:
+    """
+    统计每秒解码帧数，以及每帧解码结果占用的内存块数与字节数
+    """
+    decode(frame_class, frames)
+
+    start = time.perf_counter()
+    for _ in range(number):
+        decode(frame_class, frames)
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    result = decode(frame_class, frames)
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+
+    stats = after.compare_to(before, 'filename')
+    blocks = sum(stat.count_diff for stat in stats)
+    size = sum(stat.size_diff for stat in stats)
+    del result
+
+    return {
+        'frames_per_sec': len(frames) * number / elapsed,
+        'allocations_per_frame': blocks / len(frames),
+        'bytes_per_frame': size / len(frames),
+    }
+
+
+def main():
+    frames = record_frames()
+
+    for name, frame_class in (('pydantic', Load), ('fast', Frame)):
+        result = run(frame_class, frames)
+        print(
+            f'{name:>8}: {result["frames_per_sec"]:,.0f} frames/sec, '
+            f'{result["allocations_per_frame"]:.1f} allocations/frame, '
+            f'{result["bytes_per_frame"]:.0f} bytes/frame'
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,39 @@
+"""
+事件模型构造基准测试，对比完整校验与信任模式
+
+    python -m pyqqbot.bench.models
+"""
+from ..event.enums import EVENT_CLASS
+from ..entities.trusted import construct
+from . import measure
+from .samples import EVENTS
+
+
+def strict(model, data):
+    return model(client=None, **data)
+
+
+def trusted(model, data):
+    return construct(model, data, client=None)
+
+
+def main():
+    print(f'{"event":<36} {"strict":>12} {"trusted":>12}')
+
+    totals = {'strict': 0.0, 'trusted': 0.0}
+    for name, data in EVENTS.items():
+        model = EVENT_CLASS[name]
+        result = {}
+
+        for mode, build in (('strict', strict), ('trusted', trusted)):
+            result[mode] = measure(lambda: build(model, data), 2000)
+            totals[mode] += result[mode]
+
+        print(f'{name:<36} {1e9 / result["strict"]:>12,.0f} {1e9 / result["trusted"]:>12,.0f}')
+
+    print(f'{"all (events/sec)":<36} {len(EVENTS) * 1e9 / totals["strict"]:>12,.0f} '
+          f'{len(EVENTS) * 1e9 / totals["trusted"]:>12,.0f}')
+
+
+if __name__ == '__main__':
+    main()
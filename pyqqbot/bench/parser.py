@@ -0,0 +1,40 @@
+"""
+消息解析基准测试，使用包含大量 @ 与表情的长消息
+
+    python -m pyqqbot.bench.parser
+"""
+from ..entities.components.parser import MessageParser
+from . import measure
+
+SEGMENTS = 200
+
+
+def long_message(segments: int = SEGMENTS) -> dict:
+    content = ''.join(
+        f'第 {i} 段文字 <@!{1000 + i}> 看看这个 <emoji:{i % 300}> 在 <#{2000 + i}> 讨论 '
+        for i in range(segments)
+    )
+
+    return {
+        'content': content + '<@everyone>',
+        'attachments': [
+            {'content_type': 'image/png', 'filename': 'a.png', 'url': 'multimedia.nt.qq.com.cn/a.png'},
+            {'content_type': 'video/mp4', 'filename': 'b.mp4', 'url': 'multimedia.nt.qq.com.cn/b.mp4'},
+        ],
+    }
+
+
+def main():
+    message = long_message()
+    components = MessageParser(message).parse_dict()
+
+    parse = measure(lambda: MessageParser(message).parse_dict(), 200)
+    serialize = measure(lambda: MessageParser.to_dict(components), 200)
+
+    print(f'{len(message["content"])} chars, {len(components)} components')
+    print(f'parse:     {parse / 1000:.1f} us/message, {len(components) / parse * 1e9:,.0f} components/sec')
+    print(f'serialize: {serialize / 1000:.1f} us/message')
+
+
+if __name__ == '__main__':
+    main()
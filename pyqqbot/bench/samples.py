@@ -0,0 +1,162 @@
+"""
+基准测试使用的网关事件样本
+"""
+
+GROUP_AT_MESSAGE_CREATE = {
+    'author': {'id': 'E4F4AEA33253A2797FB897C50B81D7ED', 'member_openid': 'E4F4AEA33253A2797FB897C50B81D7ED'},
+    'content': ' 今日运势',
+    'group_id': 'C9F778FE6ADF9D1D1DBE395BF744A33A',
+    'group_openid': 'C9F778FE6ADF9D1D1DBE395BF744A33A',
+    'id': 'ROBOT1.0_veoihTJgJt1BE7gWsSmfGbFw.HjYbgxgvPn7UA2gNq9YbpyRh-GwXBkh1POJDX8ZTVSl4SMJ2BdL2kiuBxsWVA!!',
+    'timestamp': '2023-11-06T13:37:18+08:00',
+}
+
+C2C_MESSAGE_CREATE = {
+    'author': {'id': 'E4F4AEA33253A2797FB897C50B81D7ED', 'member_openid': 'E4F4AEA33253A2797FB897C50B81D7ED'},
+    'content': '今日运势',
+    'id': 'ROBOT1.0_.5Hw3lMvgWDvtmQd3Sy8swBCFaeUXZSgSVGFhmrDjiF7WA4PeqBE4tmsKs5lYs7x3TkIoXQe5vxlcc4BMlEYGg!!',
+    'timestamp': '2023-11-06T13:37:18+08:00',
+}
+
+GUILD_USER = {'avatar': 'https://thirdqq.qlogo.cn/0', 'bot': False, 'id': '1234567890', 'username': 'user'}
+GUILD_MEMBER = {'joined_at': '2023-11-06T13:37:18+08:00', 'nick': '', 'roles': ['4']}
+
+AT_MESSAGE_CREATE = {
+    'author': GUILD_USER,
+    'channel_id': '100010',
+    'content': '<@!1234> 今日运势',
+    'guild_id': '18700000000001',
+    'id': '08e092eeb983afef9e0110f1ca0c20f8fa48c1cd8c0a3801480250d0ee84a406',
+    'member': GUILD_MEMBER,
+    'mentions': [{'avatar': '', 'bot': True, 'id': '1234', 'username': 'bot'}],
+    'seq': 1,
+    'seq_in_channel': '1',
+    'timestamp': '2023-11-06T13:37:18+08:00',
+}
+
+DIRECT_MESSAGE_CREATE = {
+    'author': GUILD_USER,
+    'channel_id': '100010',
+    'content': '今日运势',
+    'guild_id': '18700000000001',
+    'id': '08e092eeb983afef9e0110f1ca0c20f8fa48c1cd8c0a3801480250d0ee84a406',
+    'member': GUILD_MEMBER,
+    'timestamp': '2023-11-06T13:37:18+08:00',
+}
+
+USER_OPERATION = {'timestamp': 1699249038, 'openid': 'E4F4AEA33253A2797FB897C50B81D7ED'}
+
+GROUP_OPERATION = {
+    'timestamp': 1699249038,
+    'group_openid': 'C9F778FE6ADF9D1D1DBE395BF744A33A',
+    'op_member_openid': 'E4F4AEA33253A2797FB897C50B81D7ED',
+}
+
+MESSAGE_REACTION = {
+    'channel_id': '100010',
+    'emoji': {'id': '4', 'type': 1},
+    'guild_id': '18700000000001',
+    'target': {'id': '08e092eeb983afef9e0110f1ca0c20f8fa48c1cd8c0a3801480250d0ee84a406', 'type': 'ReactionTargetType_MSG'},
+    'user_id': '1234567890',
+}
+
+GUILD_MEMBER_OPERATION = {
+    'guild_id': '18700000000001',
+    'joined_at': '2023-11-06T13:37:18+08:00',
+    'nick': '',
+    'op_user_id': '1234567890',
+    'roles': ['1'],
+    'user': GUILD_USER,
+}
+
+GUILD_OPERATION = {
+    'description': '',
+    'icon': 'https://groupprohead.gtimg.cn/0',
+    'id': '18700000000001',
+    'joined_at': '2023-11-06T13:37:18+08:00',
+    'max_members': 300,
+    'member_count': 10,
+    'name': 'guild',
+    'op_user_id': '1234567890',
+    'owner': False,
+    'owner_id': '1234567890',
+    'union_appid': '',
+    'union_org_id': '',
+    'union_world_id': '',
+}
+
+CHANNEL_OPERATION = {
+    'application_id': '',
+    'guild_id': '18700000000001',
+    'id': '100010',
+    'name': 'channel',
+    'op_user_id': '1234567890',
+    'owner_id': '1234567890',
+    'parent_id': '100001',
+    'permissions': '7',
+    'position': 1,
+    'private_type': 0,
+    'speak_permission': 1,
+    'sub_type': 0,
+    'type': 0,
+}
+
+FORUM_OPERATION = {'author_id': '1234567890', 'channel_id': '100010', 'guild_id': '18700000000001'}
+
+AUDIO_MEMBER = {'channel_id': '100010', 'channel_type': 2, 'guild_id': '18700000000001', 'user_id': '1234567890'}
+
+# 事件名称 -> 事件数据
+EVENTS = {
+    'READY': {
+        'version': 1,
+        'session_id': '082ee18c-0be3-491b-9d8b-fbd95c51673a',
+        'user': {'id': '1234', 'username': 'bot', 'bot': True, 'status': 1},
+        'shard': [0, 1],
+    },
+    'RESUMED': {},
+
+    'C2C_MESSAGE_CREATE': C2C_MESSAGE_CREATE,
+    'FRIEND_ADD': USER_OPERATION,
+    'FRIEND_DEL': USER_OPERATION,
+    'C2C_MSG_REJECT': USER_OPERATION,
+    'C2C_MSG_RECEIVE': USER_OPERATION,
+
+    'GROUP_AT_MESSAGE_CREATE': GROUP_AT_MESSAGE_CREATE,
+    'GROUP_ADD_ROBOT': GROUP_OPERATION,
+    'GROUP_DEL_ROBOT': GROUP_OPERATION,
+    'GROUP_MSG_REJECT': GROUP_OPERATION,
+    'GROUP_MSG_RECEIVE': GROUP_OPERATION,
+
+    'AT_MESSAGE_CREATE': AT_MESSAGE_CREATE,
+    'DIRECT_MESSAGE_CREATE': DIRECT_MESSAGE_CREATE,
+    'MESSAGE_CREATE': AT_MESSAGE_CREATE,
+    'PUBLIC_MESSAGE_DELETE': {
+        'message': {
+            'author': GUILD_USER, 'channel_id': '100010', 'guild_id': '18700000000001',
+            'id': '08e092eeb983afef9e0110f1ca0c20f8fa48c1cd8c0a3801480250d0ee84a406',
+        },
+        'op_user': GUILD_USER,
+    },
+    'MESSAGE_REACTION_ADD': MESSAGE_REACTION,
+    'MESSAGE_REACTION_REMOVE': MESSAGE_REACTION,
+
+    'GUILD_CREATE': GUILD_OPERATION,
+    'GUILD_UPDATE': GUILD_OPERATION,
+    'GUILD_DELETE': GUILD_OPERATION,
+    'CHANNEL_CREATE': CHANNEL_OPERATION,
+    'CHANNEL_UPDATE': CHANNEL_OPERATION,
+    'CHANNEL_DELETE': CHANNEL_OPERATION,
+    'GUILD_MEMBER_ADD': GUILD_MEMBER_OPERATION,
+    'GUILD_MEMBER_UPDATE': GUILD_MEMBER_OPERATION,
+    'GUILD_MEMBER_REMOVE': GUILD_MEMBER_OPERATION,
+
+    'OPEN_FORUM_POST_CREATE': FORUM_OPERATION,
+    'OPEN_FORUM_THREAD_CREATE': FORUM_OPERATION,
+    'OPEN_FORUM_THREAD_UPDATE': FORUM_OPERATION,
+    'OPEN_FORUM_THREAD_DELETE': FORUM_OPERATION,
+    'OPEN_FORUM_REPLY_CREATE': FORUM_OPERATION,
+    'OPEN_FORUM_REPLY_DELETE': FORUM_OPERATION,
+
+    'AUDIO_OR_LIVE_CHANNEL_MEMBER_ENTER': AUDIO_MEMBER,
+    'AUDIO_OR_LIVE_CHANNEL_MEMBER_EXIT': AUDIO_MEMBER,
+}
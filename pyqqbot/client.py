@@ -1,19 +1,30 @@
-from typing import Callable, Dict, List, Coroutine
+from typing import Callable, Dict, Hashable, List, Coroutine, Optional, Sequence, Set, Union
 
+import multiprocessing
 import functools
+import operator
 import aiohttp
 import asyncio
-import copy
-import sys
+import time
 
-from .models.ws import Intents, OpCode, Load, HeartBeat
-from .event.enums import EventModel, EventBody, Event
-from .event.models import Ready
-from .entities.components.parser import MessageParser
+from .models.ws import Intents, Load, Frame
+from .event.enums import EVENT_CLASS, EVENT_CLASS_NAME, EventBody, Event
 from .entities import MessageComponent
-from .protocol import QQBotProtocol, HttpClient
-from .logger import Network, Session, Event as EventLogger
-from .misc import argument_signature
+from .protocol import QQBotProtocol, HttpClient, OPENAPI_URL, TOKEN_URL
+from .gateway import Shard
+from .dispatch import EventQueue, OverflowPolicy, partition_key
+from .ratelimit import RateLimiter
+from .record import Recorder
+from .retry import RetryPolicy
+from .media import MediaCache
+from .dedupe import DedupeIndex, dedupe_key
+from .metrics import Metrics
+from .watchdog import Watchdog
+from .admin import AdminServer
+from .session import SessionStore, SessionState
+from .handoff import HandoffServer, request_handoff, handoff_path
+from .logger import Session, Event as EventLogger
+from .misc import HandlerPlan, argument_signature
 
 
 class QQBot(QQBotProtocol):
@@ -21,163 +32,430 @@ class QQBot(QQBotProtocol):
     event: Dict[
         str, List[Callable[[EventBody], Coroutine]]
     ] = {}
-
-    def __init__(self, app_id: int, client_secret: str, intents: Intents = Intents.default()):
-        super().__init__(app_id, client_secret)
+    shards: List[Shard]
+
+    def __init__(self, app_id: int, client_secret: str, intents: Intents = Intents.default(),
+                 shards: Optional[int] = None, fast_decode: bool = True,
+                 max_queue_size: int = 0, overflow: OverflowPolicy = OverflowPolicy.BLOCK,
+                 priorities: Optional[Dict[str, int]] = None,
+                 max_concurrency: int = 0, concurrency: Optional[Dict[str, int]] = None,
+                 consumers: int = 1, ordered: Optional[bool] = None, rate_limiter: Optional[RateLimiter] = None,
+                 retry_policy: Optional[RetryPolicy] = None, media_cache: Optional[MediaCache] = None,
+                 strict_validation: bool = False, recorder: Optional[Recorder] = None,
+                 openapi_url: str = OPENAPI_URL, token_url: str = TOKEN_URL,
+                 metrics: Optional[Metrics] = None, metrics_port: Optional[int] = None,
+                 watchdog: Optional[Watchdog] = None, admin_port: Optional[int] = None,
+                 heartbeat_timeout: Optional[float] = None, session_store: Optional[SessionStore] = None,
+                 handoff: Optional[str] = None, dedupe: Optional[DedupeIndex] = None):
+        """
+        :param app_id:
+        :param client_secret:
+        :param intents:
+        :param shards: 分片总数，为空时使用 /gateway/bot 推荐的分片数
+        :param fast_decode: 是否跳过网关帧的模型校验，直接解析 JSON
+        :param max_queue_size: 事件队列最大长度，为 0 时不限制
+        :param overflow: 事件队列溢出策略
+        :param priorities: 事件名称 -> 优先级，用于 OverflowPolicy.DROP_PRIORITY
+        :param max_concurrency: 同时运行的监听器数量上限，为 0 时不限制
+        :param concurrency: 事件名称 -> 该事件同时运行的监听器数量上限
+        :param consumers: 事件消费者数量，事件按会话分配到各个消费者
+        :param ordered: 同一会话的事件是否等待上一个事件的监听器执行完毕后再执行，不同会话之间互不等待，为空时在 consumers > 1 时开启
+        :param rate_limiter: OpenAPI 请求限流器，为空时不限流
+        :param retry_policy: OpenAPI 请求重试策略，为空时使用默认配置
+        :param media_cache: 富媒体上传缓存，为空时使用默认配置
+        :param strict_validation: 是否对事件数据进行完整的 pydantic 校验，默认信任网关数据以加快构造，可在调试时开启
+        :param recorder: 网关流量录制器，为空时不录制
+        :param openapi_url: OpenAPI 地址，可指向沙箱环境或本地测试服务器
+        :param token_url: 获取接口凭证的地址
+        :param metrics: 运行指标，为空时使用默认配置
+        :param metrics_port: 以 Prometheus 文本格式导出指标的本地端口，为空时不启动；多进程运行时各进程依次使用后续端口
+        :param watchdog: 事件循环看门狗，为空时不启用
+        :param admin_port: 本地管理接口端口，提供在线性能分析与内存快照，为空时不启动；多进程运行时同 metrics_port
+        :param heartbeat_timeout: 心跳响应超时时间（秒），超时后视为连接已失效并立即恢复会话，默认为心跳间隔
+        :param session_store: 网关会话存储，重启后从中恢复会话，为空时每次启动都重新 Identify
+        :param handoff: 会话交接使用的 unix socket 路径，启动时从该路径上的旧进程接管会话，并在该路径上等待下一个进程接管
+        :param dedupe: 事件去重索引，丢弃 Resume 补发或多条连接重复收到的事件，为空时使用默认配置
+        """
+        super().__init__(app_id, client_secret, openapi_url, token_url)
 
         self.app_id = app_id
         self.client_secret = client_secret
         self.intents = intents.to_int()
+        self.shard_count = shards
+        self.frame_class = Frame if fast_decode else Load
+        self.strict_validation = strict_validation
+        self.recorder = recorder
+        self.rate_limiter = rate_limiter or RateLimiter()
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.media_cache = media_cache or self.media_cache
+        self.metrics = metrics or self.metrics
+        self.metrics_port = metrics_port
+        self.watchdog = watchdog
+        self.heartbeat_timeout = heartbeat_timeout
+        self.session_store = session_store
+        self.handoff = handoff
+        self._handoff: Optional[HandoffServer] = None
+        self.dedupe = dedupe if dedupe is not None else DedupeIndex()
+        self.admin = AdminServer(self, port=admin_port) if admin_port is not None else None
 
-        self._openapi_url = 'https://api.sgroup.qq.com'
         self._access_token = None
         self._session = None
-        self._ws = None
+        self._refresh_task: Optional[asyncio.Task] = None
+
+        self.shards = []
+        self.queues: List[EventQueue] = []
+        self.consumers = consumers
+        self.ordered = ordered if ordered is not None else consumers > 1
+        self.max_queue_size = max_queue_size
+        self.overflow = overflow
+        self.priorities = priorities or {}
+
+        self._semaphore = asyncio.Semaphore(max_concurrency) if max_concurrency else None
+        self._event_semaphores = {
+            event_name: asyncio.Semaphore(limit) for event_name, limit in (concurrency or {}).items()
+        }
 
-        self._heartbeat_interval = None
-        self._session_id = None
-        self._s = 0
+        self.event = {}
+        self._handlers: Dict[str, List[HandlerPlan]] = {}
+        self._consumers: List[asyncio.Task] = []
+        # 正在运行的监听器任务
+        self._running: Set[asyncio.Task] = set()
 
-        self.queue = None
+        self.metrics.bind(self)
+
+    def run(self, loop=None, workers: int = 1):
+        """
+        启动机器人
+        :param loop:
+        :param workers: 工作进程数，大于 1 时分片会平均分配到多个进程中
+        :return:
+        """
+        if workers > 1:
+            return self._run_workers(workers)
 
-    def run(self, loop=None):
         loop = loop or asyncio.get_event_loop()
-        self.queue = asyncio.Queue(loop=loop) if sys.version_info.minor < 10 else asyncio.Queue()
         loop.run_until_complete(self._run())
 
-    async def _run(self):
+    def _run_workers(self, workers: int):
+        shard_count = self.shard_count or asyncio.run(self._fetch_shard_count())
+        context = multiprocessing.get_context('fork')
+
+        processes = [
+            context.Process(target=self._run_worker, args=(list(range(i, shard_count, workers)), shard_count))
+            for i in range(min(workers, shard_count))
+        ]
+
+        for process in processes:
+            process.start()
+
+        for process in processes:
+            process.join()
+
+    def _run_worker(self, shard_ids: List[int], shard_count: int):
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+
+        self.shard_count = shard_count
+        loop.run_until_complete(self._run(shard_ids))
+
+    async def _fetch_shard_count(self) -> int:
+        self._session = aiohttp.ClientSession()
+        self.http = self._create_http_client()
+
+        try:
+            result = await self._get_app_access_token()
+            self._access_token = self.http._access_token = f"QQBot {result.access_token}"
+            return (await self._get_gateway_bot()).shards
+        finally:
+            await self._session.close()
+            self._session = None
+
+    async def _run(self, shard_ids: Optional[List[int]] = None):
         self._access_token = None
 
         if self._session is not None:
             await self._session.close()
 
         self._session = aiohttp.ClientSession()
-        asyncio.create_task(self.access_token_refresh_loop())
-        asyncio.create_task(self.event_loop())
+        self.http = self._create_http_client()
+        self._refresh_task = asyncio.create_task(self.access_token_refresh_loop())
+        self.start_consumers()
+
+        if self.watchdog is not None:
+            self.watchdog.start(self)
+
+        if self.metrics_port is not None:
+            await self.metrics.start_server(port=self.metrics_port + (shard_ids[0] if shard_ids else 0))
+
+        if self.admin is not None:
+            self.admin.port += shard_ids[0] if shard_ids else 0
+            await self.admin.start()
 
         while self._access_token is None:
             await asyncio.sleep(1)
 
-        gateway_url = await self._get_gateway_url()
-
-        while True:
-            try:
-                self._ws = await self._session.ws_connect(gateway_url)
-                await self.ws_event_loop()
-            except aiohttp.ClientError:
-                pass
-
-    async def _auth(self):
-        if self._session_id is None:
-            load = Load(op=OpCode.Identify, d={
-                'token': self._access_token,
-                'intents': self.intents,
-                'shard': [0, 1],
-                'properties': {
-                    '$os': 'linux',
-                    '$browser': 'pyqqbot',
-                    '$device': 'pyqqbot'
-                }
-            })
+        states = None
+        if self.handoff is not None:
+            self._handoff = HandoffServer(self, handoff_path(self.handoff, shard_ids))
+            states = await request_handoff(self._handoff.path)
+        if not states:
+            states = self._load_sessions(shard_ids)
+
+        if states:
+            # 所有分片都可以 Resume 时不需要查询接入点，也不受 Identify 频率限制
+            state = next(iter(states.values()))
+            shard_count, gateway_url, max_concurrency = state.shard_count, state.gateway_url, 1
+            shard_ids = shard_ids or list(range(shard_count))
+            Session.info(f'恢复 {len(states)} 个分片的会话')
         else:
-            load = Load(op=OpCode.Resume, d={
-                'token': self._access_token,
-                'session_id': self._session_id,
-                'seq': self._s
-            })
+            gateway = await self._get_gateway_bot()
+            shard_count = self.shard_count or gateway.shards
+            gateway_url = gateway.url
+            if shard_ids is None:
+                shard_ids = list(range(shard_count))
+
+            limit = gateway.session_start_limit
+            if limit.remaining < len(shard_ids):
+                Session.warn(f'剩余可创建会话数不足: {limit.remaining}/{len(shard_ids)}')
+
+            max_concurrency = limit.max_concurrency or 1
+            states = self._load_sessions(shard_ids, shard_count, partial=True) or {}
+
+        self.shards = [
+            Shard(self, shard_id, shard_count, gateway_url, states.get(shard_id)) for shard_id in shard_ids
+        ]
+
+        if self._handoff is not None:
+            await self._handoff.start()
+
+        # 每 5 秒最多允许 max_concurrency 个分片进行 Identify，Resume 的分片不需要等待
+        await asyncio.gather(*(
+            shard.run(delay=0 if shard.shard_id in states else shard.shard_id // max_concurrency * 5)
+            for shard in self.shards
+        ))
+
+        # 会话已交接给新进程，等待剩余事件处理完毕后再返回，否则事件循环会随之停止
+        if self._handoff is not None and self._handoff.drained is not None:
+            await self._handoff.drained
+
+    def _load_sessions(self, shard_ids: Optional[List[int]] = None, shard_count: Optional[int] = None,
+                       partial: bool = False) -> Optional[Dict[int, SessionState]]:
+        """
+        从会话存储读取可以 Resume 的会话
+        :param shard_ids: 本进程负责的分片，为空时为全部分片
+        :param shard_count: 分片总数，为空时使用保存的分片总数
+        :param partial: 是否允许只有部分分片可以 Resume
+        :return: 分片 ID -> 会话，没有可用会话时（partial 为 False 时为不是全部分片都可用时）返回 None
+        """
+        if self.session_store is None:
+            return None
 
-        await self._ws.send_json(load.dict())
+        states = self.session_store.load(self.app_id)
+        shard_count = shard_count or self.shard_count
+        if shard_count is None and states:
+            shard_count = next(iter(states.values())).shard_count
 
-    async def _heartbeat(self):
-        while True:
-            if not self._session.closed:
-                await self._ws.send_json(Load(op=OpCode.Heartbeat, d=self._s).dict())
-            
-            await asyncio.sleep(self._heartbeat_interval)
+        # 分片总数变化后，原来的会话不能继续使用
+        states = {shard_id: state for shard_id, state in states.items() if state.shard_count == shard_count}
+        wanted = shard_ids if shard_ids is not None else range(shard_count or 0)
+        states = {shard_id: states[shard_id] for shard_id in wanted if shard_id in states}
+
+        if not states or not partial and len(states) < len(wanted):
+            return None
+        return states
+
+    def start_consumers(self):
+        """
+        创建事件队列并启动事件消费者
+        :return:
+        """
+        self.queues = [
+            EventQueue(self.max_queue_size, self.overflow, self.priorities) for _ in range(self.consumers)
+        ]
+        self._consumers = [asyncio.create_task(self.event_loop(queue)) for queue in self.queues]
+
+    async def close(self, timeout: float = 30):
+        """
+        停止接收事件，等待已接收的事件与正在运行的监听器处理完毕后关闭连接
+        :param timeout: 等待监听器的最长时间（秒）
+        :return:
+        """
+        if self._handoff is not None:
+            await self._handoff.stop()
+
+        for shard in self.shards:
+            await shard.close()
+
+        for queue in self.queues:
+            queue.close()
+
+        await asyncio.gather(*self._consumers)
+
+        running = [task for task in self._running if not task.done()]
+        if running:
+            Session.info(f'等待 {len(running)} 个监听器执行完毕')
+            done, pending = await asyncio.wait(running, timeout=timeout)
+            if pending:
+                Session.warn(f'{len(pending)} 个监听器在 {timeout}s 内未执行完毕')
+
+        if self.recorder is not None:
+            self.recorder.close()
+
+        await self.metrics.stop_server()
+
+        if self.session_store is not None:
+            # 已交接的会话由新进程保存，不能用旧的序号覆盖
+            if self._handoff is None or self._handoff.drained is None:
+                for shard in self.shards:
+                    shard._checkpoint()
+            self.session_store.close()
+
+        if self.watchdog is not None:
+            self.watchdog.stop()
+
+        if self.admin is not None:
+            await self.admin.stop()
+
+        if self._refresh_task is not None:
+            self._refresh_task.cancel()
+
+        if self._session is not None:
+            await self._session.close()
+
+    def _create_http_client(self) -> HttpClient:
+        return HttpClient(self.app_id, self._access_token, self._openapi_url, self._session,
+                          self.rate_limiter, self.retry_policy, self.metrics)
 
     async def access_token_refresh_loop(self):
         while not self._session.closed:
             result = await self._get_app_access_token()
-            self._access_token = f"QQBot {result.access_token}"
-            self.http = HttpClient(self.app_id, self._access_token, self._openapi_url, self._session)
+            self._access_token = self.http._access_token = f"QQBot {result.access_token}"
             await asyncio.sleep(result.expires_in - 60)
 
-    async def ws_event_loop(self):
-        while True:
-            msg = await self._ws.receive()
-
-            if msg.type == aiohttp.WSMsgType.TEXT:
-                load = Load.parse_raw(msg.data)
-                if load.op == OpCode.Hello:
-                    d = HeartBeat.parse_obj(load.d)
-                    self._heartbeat_interval = d.heartbeat_interval / 1000
-                    await self._auth()
-                elif load.op == OpCode.Dispatch:
-                    self._s = load.s
-                    if load.t == 'READY':
-                        d = Ready.parse_obj(load.d)
-                        self._session_id = d.session_id
-                        Session.info(f'已连接: @{d.user.username} ({d.user.id})')
-                        asyncio.create_task(self._heartbeat())
-                    elif load.t == 'RESUMED':
-                        Network.info('重连成功')
-
-                    await self.register_event(load)
-                elif load.op == OpCode.InvalidSession:
-                    Session.error('鉴权失败，可能是事件订阅参数有误')
-                    raise Exception('invalid session')
-                elif load.op == OpCode.HeartbeatAck:
-                    Network.info('收到心跳响应')
-                elif load.op == OpCode.Reconnect:
-                    Network.warn('收到重连请求')
-                    break
-            elif msg.type == aiohttp.WSMsgType.CLOSE:
-                if msg.data == 4009:
-                    Session.warn('连接超时，尝试重新登录')
-                elif msg.data >= 4900:
-                    Network.warn('内部错误，尝试重新登录')
-                else:
-                    continue
-
-                break
-            elif msg.type == aiohttp.WSMsgType.CLOSED:
-                Network.info('连接已关闭，尝试重新登录')
-                break
-
-    async def register_event(self, load: Load):
+    async def register_event(self, load: Union[Load, Frame]):
         """
         注册事件到事件队列
         :param load:
         :return:
         """
-        event_class_name = self.get_event_class_name()
-
         event_type = load.t
-        if event_type not in event_class_name:
+        if event_type not in EVENT_CLASS:
             EventLogger.warn(f'接收到未知事件 {load.t}: {load.d}')
             return
 
-        # 这里要把 client 传进去，因为有些事件需要用到 client
-        event_body = event_class_name[event_type](client=self, **load.d)
-        await self.queue.put(Event(name=event_type, body=event_body))
+        key = dedupe_key(load)
+        if key is not None and self.dedupe.seen(key):
+            self.metrics.events_duplicated.labels(event_type).inc()
+            EventLogger.debug(f'丢弃重复事件 {event_type}: {load.id or load.s}')
+            return
 
-    async def event_loop(self):
-        while not self._session.closed:
-            try:
-                event: Event = await asyncio.wait_for(self.queue.get(), 3)
-            except asyncio.TimeoutError:
-                continue
+        self.metrics.events_received.labels(event_type).inc()
+
+        # 没有监听器的事件直接丢弃，不构造事件模型
+        if event_type not in self._handlers:
+            self.metrics.events_dropped.labels(event_type).inc()
+            return
 
-            place_annotation = self.get_annotations_mapping()
+        event = Event(name=event_type, model=EVENT_CLASS[event_type], data=load.d, client=self,
+                      trusted=not self.strict_validation)
 
-            for callback in self.event.get(event.name, []):
-                call_params = {}
+        if len(self.queues) == 1:
+            await self.queues[0].put(event)
+        else:
+            await self.queues[hash(partition_key(event)) % len(self.queues)].put(event)
 
-                for name, annotation, default in argument_signature(callback):
-                    if annotation in place_annotation:
-                        call_params[name] = place_annotation[annotation](event)
+    async def event_loop(self, queue: EventQueue):
+        """
+        事件消费者，从队列中取出事件并调用监听器，取到停止信号后退出
+        :param queue:
+        :return:
+        """
+        queue_wait = self.metrics.queue_wait.labels(str(self.queues.index(queue)))
+        # 会话 -> 该会话上一个事件的监听器任务，同一会话的事件依次执行，不同会话互不等待
+        tails: Dict[Hashable, List[asyncio.Task]] = {}
 
-                asyncio.create_task(callback(**call_params))
+        while True:
+            event: Optional[Event] = await queue.get()
+            if event is None:
+                break
+
+            queue_wait.observe(time.monotonic() - event.received_at)
+
+            key = partition_key(event) if self.ordered else None
+            previous = tails.get(key, ()) if self.ordered else ()
+
+            tasks = []
+            for callback, injectors, name in self._handlers.get(event.name, ()):
+                try:
+                    params = {name: inject(event) for name, inject in injectors}
+                except Exception as e:
+                    EventLogger.error(f'事件 {event.name} 参数注入失败: {e}')
+                    continue
+
+                semaphores = self._get_semaphores(event.name)
+                for semaphore in semaphores:
+                    await semaphore.acquire()
+
+                task = asyncio.create_task(self._run_handler(
+                    self.metrics.handler_duration.labels(event.name, name), callback(**params), previous
+                ))
+                self._running.add(task)
+                if self.watchdog is not None:
+                    self.watchdog.track(task, event.name, name)
+                if semaphores:
+                    task.add_done_callback(functools.partial(self._release_semaphores, semaphores))
+                tasks.append(task)
+
+            if self.ordered and tasks:
+                tails[key] = tasks
+                for task in tasks:
+                    task.add_done_callback(functools.partial(self._release_tail, tails, key, tasks))
+
+            queue.task_done()
+
+    def _get_semaphores(self, event_name: str) -> tuple:
+        """
+        获取事件对应的并发限制，先获取全局限制再获取事件限制
+        """
+        semaphore = self._event_semaphores.get(event_name)
+        if self._semaphore is None:
+            return (semaphore,) if semaphore else ()
+
+        return (self._semaphore, semaphore) if semaphore else (self._semaphore,)
+
+    async def _run_handler(self, histogram, coro: Coroutine, previous: Sequence[asyncio.Task] = ()):
+        """
+        执行监听器并记录耗时，异常照常留给任务本身
+        :param histogram:
+        :param coro:
+        :param previous: 需要先执行完毕的监听器任务，即同一会话上一个事件的监听器
+        """
+        if previous:
+            try:
+                await asyncio.wait(previous)
+            except BaseException:
+                coro.close()
+                self._running.discard(asyncio.current_task())
+                raise
+
+        started = time.perf_counter()
+        try:
+            return await coro
+        finally:
+            histogram.observe(time.perf_counter() - started)
+            self._running.discard(asyncio.current_task())
+
+    @staticmethod
+    def _release_tail(tails: Dict[Hashable, List[asyncio.Task]], key: Hashable, tasks: List[asyncio.Task],
+                      task: asyncio.Task):
+        # 会话的最后一个事件处理完毕后移除，避免记录所有出现过的会话
+        if tails.get(key) is tasks and all(task.done() for task in tasks):
+            del tails[key]
+
+    @staticmethod
+    def _release_semaphores(semaphores: tuple, task: asyncio.Task):
+        for semaphore in semaphores:
+            semaphore.release()
 
     def add_event_handler(self, event_name: str, func: Callable):
         """
@@ -186,11 +464,15 @@ class QQBot(QQBotProtocol):
         :param func:
         :return:
         """
-        if event_name not in self.get_event_class_name():
+        if event_name not in EVENT_CLASS:
             raise ValueError('未知监听事件: %s' % event_name)
 
+        plan = self.compile_handler(event_name, func)
+
         self.event.setdefault(event_name, [])
         self.event[event_name].append(func)
+        self._handlers.setdefault(event_name, [])
+        self._handlers[event_name].append(plan)
 
     def event_handler(self, event_name: str):
         def decorator(func):
@@ -199,28 +481,34 @@ class QQBot(QQBotProtocol):
 
         return decorator
 
+    def compile_handler(self, event_name: str, func: Callable) -> HandlerPlan:
+        """
+        解析监听器的参数签名，生成参数注入计划
+        :param event_name:
+        :param func:
+        :return:
+        """
+        event_class = EVENT_CLASS[event_name]
+        place_annotation = self.get_annotations_mapping()
+
+        injectors = []
+        for name, annotation, default in argument_signature(func):
+            if annotation is event_class:
+                injectors.append((name, operator.attrgetter('body')))
+            elif annotation in EVENT_CLASS_NAME:
+                raise ValueError(f'cannot look up a non-listened event: {EVENT_CLASS_NAME[annotation]}')
+            elif annotation in place_annotation:
+                injectors.append((name, place_annotation[annotation]))
+
+        return HandlerPlan(callback=func, injectors=tuple(injectors),
+                           name=f'{func.__module__}.{getattr(func, "__qualname__", repr(func))}')
+
     @staticmethod
     def get_event_class_name():
-        return {
-            event_name: event_class.value for event_name, event_class in EventModel.__members__.items()
-        }
+        return EVENT_CLASS
 
     def get_annotations_mapping(self):
         return {
             QQBot: lambda event: self,
-            List[MessageComponent]: lambda event: MessageParser(event.body.dict()).parse_dict(),
-            **self.generate_event_annotation(),
-        }
-
-    @staticmethod
-    def generate_event_annotation():
-        def wrapper(name, event_context):
-            if name != event_context.name:
-                raise ValueError("cannot look up a non-listened event.")
-
-            return event_context.body
-
-        return {
-            event_class.value: functools.partial(wrapper, copy.copy(event_name))
-            for event_name, event_class in EventModel.__members__.items()
+            List[MessageComponent]: operator.attrgetter('components'),
         }
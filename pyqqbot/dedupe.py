@@ -0,0 +1,98 @@
+from array import array
+from typing import Hashable, Optional, Set, Union
+
+import time
+
+from .models.ws import Load, Frame
+
+
+# 数据中的 id 为消息 ID 的事件，其他事件的 id 是频道、子频道等实体的 ID，同一实体的多次更新会被误判为重复
+MESSAGE_EVENTS = frozenset((
+    'MESSAGE_CREATE', 'AT_MESSAGE_CREATE', 'DIRECT_MESSAGE_CREATE', 'GROUP_AT_MESSAGE_CREATE', 'C2C_MESSAGE_CREATE',
+))
+
+
+def dedupe_key(load: Union[Load, Frame]) -> Optional[Hashable]:
+    """
+    获取事件的去重键：优先使用网关下发的事件 ID，没有事件 ID 时只对消息事件使用事件类型与消息 ID。
+    序号只在同一会话内唯一，各分片及重新 Identify 后都从 1 开始，不能作为去重键
+    :param load:
+    :return: 无法判断时（如 READY、GUILD_UPDATE）返回 None，不去重
+    """
+    if load.id:
+        return load.id
+
+    if load.t not in MESSAGE_EVENTS or not isinstance(load.d, dict) or 'id' not in load.d:
+        return None
+
+    return load.t, load.d['id']
+
+
+class DedupeIndex:
+    """
+    有界的事件去重索引，环形缓冲区按到达顺序保存键的哈希值与到达时间，集合用于查找；
+    超过时间窗口或容量已满时淘汰最早的记录，内存占用只与容量有关
+    """
+    capacity: int
+    window: float
+
+    def __init__(self, capacity: int = 100000, window: float = 300):
+        """
+        :param capacity: 最多记录的事件数，为 0 时不去重
+        :param window: 记录保留的时间（秒），应覆盖 Resume 补发与多条连接之间的延迟
+        """
+        self.capacity = capacity
+        self.window = window
+
+        self.duplicates = 0
+
+        # 只保存哈希值，64 位哈希在容量范围内的碰撞概率可以忽略
+        self._hashes = array('q', bytes(8 * capacity))
+        self._times = array('d', bytes(8 * capacity))
+        self._set: Set[int] = set()
+        self._head = 0  # 下一个写入位置
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def seen(self, key: Hashable, now: Optional[float] = None) -> bool:
+        """
+        检查事件是否已在时间窗口内出现过，未出现过时记录该事件
+        :param key:
+        :param now:
+        :return:
+        """
+        if not self.capacity:
+            return False
+
+        now = time.monotonic() if now is None else now
+        self._expire(now - self.window)
+
+        digest = hash(key)
+        if digest in self._set:
+            self.duplicates += 1
+            return True
+
+        if self._size == self.capacity:
+            # 容量已满，覆盖最早的记录
+            self._set.discard(self._hashes[self._head])
+        else:
+            self._size += 1
+
+        self._hashes[self._head] = digest
+        self._times[self._head] = now
+        self._set.add(digest)
+        self._head = (self._head + 1) % self.capacity
+        return False
+
+    def _expire(self, deadline: float):
+        tail = (self._head - self._size) % self.capacity
+        while self._size and self._times[tail] < deadline:
+            self._set.discard(self._hashes[tail])
+            tail = (tail + 1) % self.capacity
+            self._size -= 1
+
+    def clear(self):
+        self._set.clear()
+        self._head = self._size = 0
@@ -0,0 +1,119 @@
+from collections import Counter
+from enum import Enum
+from typing import Dict, Hashable, Optional
+
+import asyncio
+
+from .event.models import Event
+from .logger import Event as EventLogger
+
+
+class OverflowPolicy(Enum):
+    """
+    事件队列溢出策略
+    """
+    BLOCK = 'block'  # 阻塞网关读取，直到队列有空位
+    DROP_OLDEST = 'drop_oldest'  # 丢弃队列中最早的事件
+    DROP_PRIORITY = 'drop_priority'  # 丢弃优先级最低的事件
+
+
+def partition_key(event: Event) -> Hashable:
+    """
+    获取事件所属的会话，同一会话内的事件会被分配到同一个消费者
+    :param event:
+    :return:
+    """
+    data = event.data or {}
+
+    for key in ('group_openid', 'channel_id', 'guild_id', 'openid', 'user_id'):
+        if key in data:
+            return data[key]
+
+    author = data.get('author')
+    if author:
+        return author.get('member_openid') or author.get('id')
+
+    return event.name
+
+
+class EventQueue(asyncio.Queue):
+    """
+    有界事件队列，队列已满时按溢出策略处理新事件
+    """
+    policy: OverflowPolicy
+    priorities: Dict[str, int]
+    closed: bool
+    dropped: Counter
+
+    def __init__(self, maxsize: int = 0, policy: OverflowPolicy = OverflowPolicy.BLOCK,
+                 priorities: Optional[Dict[str, int]] = None):
+        """
+        :param maxsize: 最大队列长度，为 0 时不限制
+        :param policy: 溢出策略
+        :param priorities: 事件名称 -> 优先级，数值越大越重要，未指定的事件为 0
+        """
+        super().__init__(maxsize)
+
+        self.policy = policy
+        self.priorities = priorities or {}
+        self.closed = False
+
+        # 溢出策略 -> 丢弃事件数
+        self.dropped = Counter()
+        # 事件名称 -> 丢弃事件数
+        self.dropped_events = Counter()
+
+    async def put(self, event: Event):
+        # 停止信号之后的事件不会再被消费
+        if self.closed:
+            EventLogger.debug(f'事件队列已关闭，丢弃事件 {event.name}')
+            return
+
+        if self.full() and self.policy is not OverflowPolicy.BLOCK:
+            if self.policy is OverflowPolicy.DROP_OLDEST:
+                victim = self._queue[0]
+                if victim is None:
+                    return self._drop(event)
+
+                self._queue.popleft()
+            else:
+                victim = self._lowest_priority(event)
+                if victim is event:
+                    return self._drop(event)
+
+                self._queue.remove(victim)
+
+            self.task_done()
+            self._drop(victim)
+
+        await super().put(event)
+
+    def close(self):
+        """
+        放入停止信号，消费者处理完此前的事件后退出
+        :return:
+        """
+        if self.closed:
+            return
+
+        self.closed = True
+        self._put(None)
+        self._unfinished_tasks += 1
+        self._finished.clear()
+        self._wakeup_next(self._getters)
+
+    def _lowest_priority(self, event: Event) -> Event:
+        """
+        找出优先级最低的事件，同优先级时取最早的事件，新事件优先级更低时返回新事件；停止信号不会被选中
+        """
+        victim = min((queued for queued in self._queue if queued is not None),
+                     key=lambda queued: self.priorities.get(queued.name, 0), default=event)
+        if self.priorities.get(event.name, 0) < self.priorities.get(victim.name, 0):
+            return event
+
+        return victim
+
+    def _drop(self, event: Event):
+        self.dropped[self.policy.value] += 1
+        self.dropped_events[event.name] += 1
+        EventLogger.debug(f'事件队列已满，丢弃事件 {event.name}')
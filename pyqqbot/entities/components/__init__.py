@@ -1,35 +1,134 @@
-from pydantic import BaseModel, validator
-from typing import Optional
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+import hashlib
+import base64
+import mmap
+import os
 
 from .enums import *
 
+# base64 每 3 字节编码为 4 字节，分块大小需为 3 的倍数才能逐块编码
+CHUNK_SIZE = 3 * 64 * 1024
+
+# 本地文件的哈希缓存：(路径, 大小, 修改时间) -> sha256，文件被修改后自动失效
+DIGEST_CACHE_SIZE = 1024
+_path_digests: Dict[Tuple[str, int, int], str] = {}
+
+
+class MessageComponent:
+    """
+    消息组件，字段存放在 __slots__ 中，构造时不做校验，
+    只在 API 边界（parse_obj 与事件模型字段）进行校验
+    """
+    __slots__ = ()
+
+    _fields: Tuple[str, ...] = ()
+
+    __hash__ = None
 
-class MessageComponent(BaseModel):
     def __str__(self):
         raise NotImplementedError
 
+    def __repr__(self):
+        return f'{type(self).__name__}({", ".join(f"{field}={getattr(self, field)!r}" for field in self._fields)})'
+
+    def __eq__(self, other):
+        if type(self) is not type(other):
+            return NotImplemented
+        return all(getattr(self, field) == getattr(other, field) for field in self._fields)
+
+    def dict(self) -> dict:
+        return {field: getattr(self, field) for field in self._fields}
+
+    @classmethod
+    def construct(cls, obj: dict):
+        """
+        不经校验由 dict 构造组件，忽略未知字段
+        """
+        return cls(**{field: obj[field] for field in cls._fields if field in obj})
+
+    @classmethod
+    def parse_obj(cls, obj: Any):
+        if isinstance(obj, cls):
+            return obj
+        if not isinstance(obj, dict):
+            raise TypeError(f'{cls.__name__} 只能由 dict 构造')
+
+        return cls.construct(obj)
+
+    @classmethod
+    def __get_validators__(cls):
+        # 作为 pydantic 模型字段时使用 parse_obj 校验
+        yield cls.parse_obj
+
 
 class Plain(MessageComponent):
+    __slots__ = _fields = ('content',)
+
     content: str
 
     def __init__(self, content: str):
-        super().__init__(content=content)
+        self.content = content
 
     def __str__(self):
         return self.content
 
 
 class At(MessageComponent):
+    __slots__ = _fields = ('id',)
+
     id: str
 
     def __init__(self, id: str):
-        super().__init__(id=id)
+        self.id = id
 
     def __str__(self):
         return f'<@!{self.id}>'
 
 
+class AtAll(MessageComponent):
+    __slots__ = ()
+
+    def __str__(self):
+        return '<@everyone>'
+
+
+class Face(MessageComponent):
+    """
+    系统表情
+    """
+    __slots__ = _fields = ('id',)
+
+    id: str
+
+    def __init__(self, id: str):
+        self.id = id
+
+    def __str__(self):
+        return f'<emoji:{self.id}>'
+
+
+class ChannelMention(MessageComponent):
+    """
+    子频道链接
+    """
+    __slots__ = _fields = ('id',)
+
+    id: str
+
+    def __init__(self, id: str):
+        self.id = id
+
+    def __str__(self):
+        return f'<#{self.id}>'
+
+
 class Attachment(MessageComponent):
+    _fields = (
+        'id', 'content_type', 'filename', 'height', 'width', 'size', 'url', 'file', 'path', 'type',
+    )
+    __slots__ = _fields + ('_digest',)
+
     id: Optional[str]
     content_type: Optional[str]
     filename: str
@@ -39,29 +138,135 @@ class Attachment(MessageComponent):
     url: Optional[str]
 
     file: Optional[bytes]
+    path: Optional[str]
     type: Optional[AttachmentType]
 
-    @validator('url')
-    def url_validator(cls, v):
-        if not v.startswith('https://') and not v.startswith('http://'):
-            return 'https://' + v
-        return v
+    default_type: Optional[AttachmentType] = None
+
+    def __init__(self, filename: str = None, url: Optional[str] = None, file: Optional[bytes] = None,
+                 path: Optional[str] = None, type: Optional[AttachmentType] = None, id: Optional[str] = None,
+                 content_type: Optional[str] = None, height: Optional[int] = None, width: Optional[int] = None,
+                 size: Optional[int] = None):
+        if url and not url.startswith('https://') and not url.startswith('http://'):
+            url = 'https://' + url
+
+        self.id = id
+        self.content_type = content_type
+        self.filename = filename
+        self.height = height
+        self.width = width
+        self.size = size
+        self.url = url
+        self.file = file
+        self.path = path
+        self.type = type if type is not None else self.default_type
+        self._digest = None
+
+    @classmethod
+    def parse_obj(cls, obj: Any):
+        attachment = super().parse_obj(obj)
+        if attachment is obj:
+            return attachment
+
+        if not isinstance(attachment.filename, str):
+            raise ValueError('filename 不能为空')
+
+        for field in ('height', 'width', 'size'):
+            value = getattr(attachment, field)
+            if value is not None:
+                setattr(attachment, field, int(value))
+
+        if attachment.type is not None and not isinstance(attachment.type, AttachmentType):
+            attachment.type = AttachmentType(attachment.type)
+
+        return attachment
 
     def __str__(self):
         return None
 
+    def file_size(self) -> int:
+        if self.file is not None:
+            return len(self.file)
+        return os.path.getsize(self.path)
+
+    def iter_file(self, chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+        """
+        分块读取文件内容，本地文件通过内存映射读取，不会整体载入内存
+        :param chunk_size:
+        :return:
+        """
+        if self.file is not None:
+            view = memoryview(self.file)
+            for i in range(0, len(view), chunk_size):
+                yield view[i:i + chunk_size]
+            return
+
+        with open(self.path, 'rb') as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return
+
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+                for i in range(0, len(m), chunk_size):
+                    yield m[i:i + chunk_size]
+
+    def iter_base64(self, chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+        """
+        分块进行 base64 编码
+        :param chunk_size: 必须为 3 的倍数
+        :return:
+        """
+        for chunk in self.iter_file(chunk_size):
+            yield base64.b64encode(chunk)
+
+    def base64_size(self) -> int:
+        return (self.file_size() + 2) // 3 * 4
+
+    def _digest_key(self) -> Tuple[str, int, int]:
+        stat = os.stat(self.path)
+        return self.path, stat.st_size, stat.st_mtime_ns
+
+    def cached_digest(self) -> Optional[str]:
+        """
+        已经计算过的 sha256，未计算过时返回 None
+        """
+        if self.file is not None:
+            return self._digest
+        return _path_digests.get(self._digest_key())
+
+    def digest(self) -> str:
+        """
+        文件内容的 sha256，内存中的文件按组件缓存，本地文件按路径、大小与修改时间缓存
+        """
+        digest = self.cached_digest()
+        if digest is not None:
+            return digest
+
+        key = self._digest_key() if self.file is None else None
+
+        sha256 = hashlib.sha256()
+        for chunk in self.iter_file():
+            sha256.update(chunk)
+        digest = sha256.hexdigest()
+
+        if key is None:
+            self._digest = digest
+        else:
+            if len(_path_digests) >= DIGEST_CACHE_SIZE:
+                _path_digests.pop(next(iter(_path_digests)), None)
+            _path_digests[key] = digest
+
+        return digest
+
 
 class Image(Attachment):
-    type: Optional[AttachmentType] = AttachmentType.IMAGE
+    __slots__ = ()
+
+    default_type = AttachmentType.IMAGE
 
     @staticmethod
     def from_local_storage(path: str):
         filename = path.split('/')[-1]
-
-        with open(path, 'rb') as f:
-            file = f.read()
-
-        return Image(file=file, filename=filename)
+        return Image(path=path, filename=filename)
 
     @staticmethod
     def from_bytes(file: bytes, filename: str):
@@ -69,39 +274,33 @@ class Image(Attachment):
 
 
 class Video(Attachment):
-    type: Optional[AttachmentType] = AttachmentType.VIDEO
+    __slots__ = ()
+
+    default_type = AttachmentType.VIDEO
 
     @staticmethod
     def from_local_storage(path: str):
         filename = path.split('/')[-1]
-
-        with open(path, 'rb') as f:
-            file = f.read()
-
-        return Video(file=file, filename=filename)
+        return Video(path=path, filename=filename)
 
 
 class Voice(Attachment):
-    type: Optional[AttachmentType] = AttachmentType.VOICE
+    __slots__ = ()
+
+    default_type = AttachmentType.VOICE
 
     @staticmethod
     def from_local_storage(path: str):
         filename = path.split('/')[-1]
-
-        with open(path, 'rb') as f:
-            file = f.read()
-
-        return Voice(file=file, filename=filename)
+        return Voice(path=path, filename=filename)
 
 
 class File(Attachment):
-    type: Optional[AttachmentType] = AttachmentType.FILE
+    __slots__ = ()
+
+    default_type = AttachmentType.FILE
 
     @staticmethod
     def from_local_storage(path: str):
         filename = path.split('/')[-1]
-
-        with open(path, 'rb') as f:
-            file = f.read()
-
-        return File(file=file, filename=filename)
+        return File(path=path, filename=filename)
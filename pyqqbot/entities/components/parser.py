@@ -4,6 +4,62 @@ import re
 
 from . import *
 
+# 内嵌标签，单次扫描即可切分，不会回溯
+TOKEN_PATTERN = re.compile(
+    r'<(?:@(?P<everyone>everyone)|@!?(?P<at>[0-9A-Za-z_-]+)|emoji:(?P<face>\d+)|#(?P<channel>\d+))>'
+)
+
+INLINE_COMPONENTS = (Plain, At, AtAll, Face, ChannelMention)
+
+
+def tokenize(content: str) -> List[MessageComponent]:
+    """
+    将消息内容切分为文字与内嵌标签组件
+    :param content:
+    :return:
+    """
+    components = []
+    position = 0
+
+    for match in TOKEN_PATTERN.finditer(content):
+        start = match.start()
+        if start > position:
+            components.append(Plain(content[position:start]))
+
+        kind = match.lastgroup
+        if kind == 'at':
+            components.append(At(match.group('at')))
+        elif kind == 'face':
+            components.append(Face(match.group('face')))
+        elif kind == 'channel':
+            components.append(ChannelMention(match.group('channel')))
+        else:
+            components.append(AtAll())
+
+        position = match.end()
+
+    if position < len(content):
+        components.append(Plain(content[position:]))
+
+    return components
+
+
+def attachment_class(content_type: str | None) -> type:
+    """
+    根据 content_type 选择附件组件
+    :param content_type:
+    :return:
+    """
+    if content_type:
+        if content_type.startswith('image'):
+            return Image
+        if content_type.startswith('video'):
+            return Video
+        if content_type.startswith(('audio', 'voice')):
+            return Voice
+
+    return File
+
 
 class MessageParser:
     _message: dict
@@ -27,15 +83,13 @@ class MessageParser:
                 continue
 
             if key == 'content':
-                for match in re.findall(r'([\s\S]*)|<@!(\d+)>', value):
-                    if match[0] and match[0] != '':
-                        components.append(Plain(match[0]))
-                    elif match[1]:
-                        components.append(At(match[1]))
+                components += tokenize(value)
             elif key == 'attachments':
                 for attachment in value:
-                    if attachment['content_type'].startswith('image'):
-                        components.append(Image.parse_obj(attachment))
+                    if isinstance(attachment, Attachment):
+                        components.append(attachment)
+                    else:
+                        components.append(attachment_class(attachment.get('content_type')).parse_obj(attachment))
 
         return components
 
@@ -47,14 +101,15 @@ class MessageParser:
         message = {
             'content': '',
         }
+        content = []
 
         for component in components:
-            if isinstance(component, (Plain, At)):
-                message['content'] += str(component)
+            if isinstance(component, INLINE_COMPONENTS):
+                content.append(str(component))
             elif isinstance(component, Image):
                 if component.url:
                     message['image'] = component.url
 
-        message['content'] = message['content'].strip()
+        message['content'] = ''.join(content).strip()
 
         return message
@@ -0,0 +1,92 @@
+from pydantic import BaseModel
+from pydantic.class_validators import make_generic_validator
+from pydantic.fields import ModelField, SHAPE_SINGLETON, SHAPE_LIST, SHAPE_SEQUENCE
+from typing import Any, Callable, Dict, List, Optional, Tuple, Type
+from enum import Enum
+
+from .components import MessageComponent
+
+_MISSING = object()
+
+# 模型 -> 构造计划
+_plans: Dict[Type[BaseModel], List[Tuple]] = {}
+
+
+def construct(model: Type[BaseModel], data: dict, **values) -> BaseModel:
+    """
+    信任模式：不进行逐字段校验，直接由网关数据构造模型。
+    嵌套模型、枚举与消息组件会被转换，字段上的 validator 仍会执行（例如权限位解析），
+    其余字段保持原始值，缺失的必填字段不会报错
+    :param model:
+    :param data: 网关下发的原始数据
+    :param values: 额外的字段值，优先于 data，例如 client
+    :return:
+    """
+    plan = _plans.get(model)
+    if plan is None:
+        plan = _plans[model] = _compile(model)
+
+    fields = {}
+    fields_set = set()
+
+    for name, alias, field, convert, pre, post in plan:
+        value = values.get(name, _MISSING)
+        if value is _MISSING:
+            value = data.get(alias, _MISSING)
+
+        if value is _MISSING:
+            if not field.required:
+                fields[name] = field.get_default()
+            continue
+
+        for validator in pre:
+            value = validator(model, value, fields, field, model.__config__)
+        if convert is not None and value is not None:
+            value = convert(value)
+        for validator in post:
+            value = validator(model, value, fields, field, model.__config__)
+
+        fields[name] = value
+        fields_set.add(name)
+
+    obj = model.__new__(model)
+    object.__setattr__(obj, '__dict__', fields)
+    object.__setattr__(obj, '__fields_set__', fields_set)
+    obj._init_private_attributes()
+    return obj
+
+
+def _compile(model: Type[BaseModel]) -> List[Tuple]:
+    plan = []
+
+    for name, field in model.__fields__.items():
+        pre = [make_generic_validator(v.func) for v in field.class_validators.values() if v.pre]
+        post = [make_generic_validator(v.func) for v in field.class_validators.values() if not v.pre]
+        plan.append((name, field.alias, field, _converter(field), pre, post))
+
+    return plan
+
+
+def _converter(field: ModelField) -> Optional[Callable[[Any], Any]]:
+    type_ = field.type_
+    if not isinstance(type_, type):
+        return None
+
+    if issubclass(type_, BaseModel):
+        def item(value):
+            return construct(type_, value) if isinstance(value, dict) else value
+    elif issubclass(type_, MessageComponent):
+        def item(value):
+            return type_.construct(value) if isinstance(value, dict) else value
+    elif issubclass(type_, Enum):
+        def item(value):
+            return value if isinstance(value, type_) else type_(value)
+    else:
+        return None
+
+    if field.shape == SHAPE_SINGLETON:
+        return item
+    if field.shape in (SHAPE_LIST, SHAPE_SEQUENCE):
+        return lambda value: [item(v) for v in value]
+
+    return None
@@ -51,6 +51,17 @@ class EventModel(Enum):
     AUDIO_OR_LIVE_CHANNEL_MEMBER_EXIT = AudioChannelMemberExit
 
 
+# 事件名称 -> 事件模型
+EVENT_CLASS = {
+    event_name: event_class.value for event_name, event_class in EventModel.__members__.items()
+}
+
+# 事件模型 -> 事件名称
+EVENT_CLASS_NAME = {
+    event_class: event_name for event_name, event_class in EVENT_CLASS.items()
+}
+
+
 class EventType(Enum):
     """
     事件类型
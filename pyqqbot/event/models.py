@@ -1,6 +1,12 @@
 from pydantic import BaseModel
+from typing import Any, List, Optional, Type
+
+import time
 
 from ..entities import Bot
+from ..entities.components import MessageComponent, Plain, At
+from ..entities.components.parser import MessageParser
+from ..entities.trusted import construct
 
 
 class EventBody(BaseModel):
@@ -18,11 +24,82 @@ class Resumed(EventBody):
     pass
 
 
-class Event(BaseModel):
+class Event:
+    """
+    事件，事件体在首次访问时才进行校验
+    """
+    __slots__ = (
+        'name', 'data', 'client', 'trusted', 'received_at', '_model', '_body', '_components', '_plain_text',
+        '_mentions',
+    )
+
     name: str
-    body: EventBody
+    data: Optional[dict]
+    received_at: float
 
-    def __init__(self, name: str, body: EventBody):
-        super().__init__(name=name, body=body)
+    def __init__(self, name: str, body: Optional[EventBody] = None, model: Optional[Type[BaseModel]] = None,
+                 data: Optional[dict] = None, client: Any = None, trusted: bool = False):
+        """
+        :param name:
+        :param body: 已构造的事件体
+        :param model: 事件模型，与 data 一起用于延迟构造事件体
+        :param data: 网关下发的原始数据
+        :param client:
+        :param trusted: 是否跳过逐字段校验构造事件体
+        """
         self.name = name
-        self.body = body
+        self.data = data
+        self.client = client
+        self.trusted = trusted
+        # 接收时间（time.monotonic），用于统计排队时间
+        self.received_at = time.monotonic()
+
+        self._model = model
+        self._body = body
+
+        self._components = None
+        self._plain_text = None
+        self._mentions = None
+
+    def __repr__(self):
+        return f'<Event {self.name}>'
+
+    @property
+    def body(self) -> EventBody:
+        if self._body is None:
+            # 这里要把 client 传进去，因为有些事件需要用到 client
+            if self.trusted:
+                self._body = construct(self._model, self.data, client=self.client)
+            else:
+                self._body = self._model(client=self.client, **self.data)
+        return self._body
+
+    @property
+    def components(self) -> List[MessageComponent]:
+        """
+        消息组件列表，每个事件只解析一次并由所有监听器共享，请勿修改
+        """
+        if self._components is None:
+            message = self.data if self.data is not None else self.body.dict()
+            self._components = MessageParser(message).parse_dict()
+        return self._components
+
+    @property
+    def plain_text(self) -> str:
+        """
+        消息中的文字部分
+        """
+        if self._plain_text is None:
+            self._plain_text = ''.join(
+                component.content for component in self.components if isinstance(component, Plain)
+            )
+        return self._plain_text
+
+    @property
+    def mentions(self) -> List[At]:
+        """
+        消息中 @ 的用户
+        """
+        if self._mentions is None:
+            self._mentions = [component for component in self.components if isinstance(component, At)]
+        return self._mentions
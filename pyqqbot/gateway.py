@@ -0,0 +1,268 @@
+from typing import Any, Optional
+
+import aiohttp
+import asyncio
+import time
+
+from .models.ws import OpCode, Load, HeartBeat
+from .event.models import Ready
+from .session import SessionState
+from .logger import Network, Session
+
+
+class Shard:
+    """
+    网关分片连接，每个分片持有独立的会话、序号与心跳状态
+    """
+    client: Any
+    shard_id: int
+    shard_count: int
+    gateway_url: str
+
+    def __init__(self, client: Any, shard_id: int, shard_count: int, gateway_url: str,
+                 state: Optional[SessionState] = None):
+        """
+        :param client: QQBot
+        :param shard_id:
+        :param shard_count:
+        :param gateway_url:
+        :param state: 之前保存的会话，连接后直接 Resume
+        """
+        self.client = client
+        self.shard_id = shard_id
+        self.shard_count = shard_count
+        self.gateway_url = gateway_url
+
+        self._ws = None
+        self._closed = False
+
+        self._heartbeat_interval = None
+        self._heartbeat_sent = None
+        self._heartbeat_task = None
+        self._heartbeat_acked = asyncio.Event()
+        self._receiver = None
+        self._zombie = False
+        # 最近一次心跳的往返时间（秒）
+        self.latency = None
+        self._session_id = state.session_id if state is not None else None
+        self._s = state.seq if state is not None else 0
+        self._resuming = False
+
+    def __repr__(self):
+        return f'<Shard {self.shard_id}/{self.shard_count}>'
+
+    async def run(self, delay: float = 0):
+        """
+        连接网关并持续接收事件，连接断开后自动重连
+        :param delay: 首次鉴权前的等待时间，用于错开多个分片的 Identify
+        :return:
+        """
+        if delay:
+            await asyncio.sleep(delay)
+
+        connected = False
+        while not self._closed and not self.client._session.closed:
+            if connected:
+                self.client.metrics.reconnects.labels(str(self.shard_id)).inc()
+            connected = True
+
+            self._zombie = False
+            try:
+                self._ws = await self.client._session.ws_connect(self.gateway_url)
+                # 在子任务中接收事件，心跳超时时可以直接取消接收，不必等待 TCP 发现连接已断开
+                self._receiver = asyncio.create_task(self.ws_event_loop())
+                await self._receiver
+            except aiohttp.ClientError:
+                pass
+            except asyncio.CancelledError:
+                if not self._zombie:
+                    raise
+            finally:
+                await self._disconnect()
+
+    async def detach(self) -> Optional[SessionState]:
+        """
+        停止接收事件并断开连接，但保留会话，交给其他进程 Resume
+        :return: 会话，尚未建立会话时返回 None
+        """
+        self._closed = True
+
+        if self._ws is not None:
+            # 使用非 1000 的关闭码，网关不会因正常关闭而使会话失效
+            await self._ws.close(code=4000)
+
+        # 等待正在处理的事件进入队列，确保交出的序号之前的事件都已接收
+        receiver = self._receiver
+        if receiver is not None:
+            await asyncio.wait([receiver])
+
+        if self._session_id is None:
+            return None
+
+        return SessionState(self._session_id, self._s, self.gateway_url, self.shard_count, time.time())
+
+    async def _disconnect(self):
+        if self._heartbeat_task is not None:
+            self._heartbeat_task.cancel()
+            self._heartbeat_task = None
+
+        if self._receiver is not None:
+            self._receiver.cancel()
+            self._receiver = None
+
+        # 接收被取消后连接已标记为异常关闭，这里会立即释放底层连接；
+        # 断开后要 Resume，不能使用会使会话失效的关闭码 1000
+        if self._ws is not None and not self._ws.closed:
+            await self._ws.close(code=4000)
+
+    async def close(self):
+        """
+        停止接收事件并断开连接，配置了会话存储时保留会话，下次启动时 Resume
+        :return:
+        """
+        self._closed = True
+
+        if self._ws is not None:
+            # 关闭码 1000 会使会话失效
+            await self._ws.close(code=4000 if self.client.session_store is not None else 1000)
+
+    async def _auth(self):
+        if self._session_id is None:
+            load = Load(op=OpCode.Identify, d={
+                'token': self.client._access_token,
+                'intents': self.client.intents,
+                'shard': [self.shard_id, self.shard_count],
+                'properties': {
+                    '$os': 'linux',
+                    '$browser': 'pyqqbot',
+                    '$device': 'pyqqbot'
+                }
+            })
+            self.client.metrics.identifies.labels(str(self.shard_id)).inc()
+        else:
+            load = Load(op=OpCode.Resume, d={
+                'token': self.client._access_token,
+                'session_id': self._session_id,
+                'seq': self._s
+            })
+
+        self._resuming = self._session_id is not None
+        await self._ws.send_json(load.dict())
+
+    def _checkpoint(self):
+        """
+        保存当前会话，实际写入由会话存储批量进行
+        """
+        store = self.client.session_store
+        if store is not None and self._session_id is not None:
+            store.save(self.client.app_id, self.shard_id, SessionState(
+                self._session_id, self._s, self.gateway_url, self.shard_count, time.time()
+            ))
+
+    def _invalidate(self):
+        """
+        会话已失效，清除会话后重新 Identify
+        """
+        self._session_id = None
+        self._s = 0
+
+        if self.client.session_store is not None:
+            self.client.session_store.delete(self.client.app_id, self.shard_id)
+
+    def _start_heartbeat(self):
+        """
+        每个连接只运行一个心跳任务，连接断开时随之取消
+        """
+        if self._heartbeat_task is None or self._heartbeat_task.done():
+            self._heartbeat_task = asyncio.create_task(self._heartbeat(self._ws))
+
+    async def _heartbeat(self, ws: aiohttp.ClientWebSocketResponse):
+        interval = self._heartbeat_interval
+        # 超时时间不能超过心跳间隔，否则会推迟下一次心跳
+        timeout = min(self.client.heartbeat_timeout or interval, interval)
+
+        while not ws.closed:
+            self._heartbeat_acked.clear()
+            sent = self._heartbeat_sent = time.monotonic()
+
+            try:
+                await ws.send_json(Load(op=OpCode.Heartbeat, d=self._s).dict())
+            except (ConnectionError, aiohttp.ClientError):
+                return
+
+            try:
+                await asyncio.wait_for(self._heartbeat_acked.wait(), timeout)
+            except asyncio.TimeoutError:
+                Network.warn(f'分片 {self.shard_id} 在 {timeout:.1f}s 内未收到心跳响应，连接可能已失效，尝试恢复会话')
+                self.client.metrics.zombies.labels(str(self.shard_id)).inc()
+                self._zombie = True
+                if self._receiver is not None:
+                    self._receiver.cancel()
+                return
+
+            # 空闲时也按心跳间隔保存会话
+            self._checkpoint()
+            await asyncio.sleep(max(0.0, sent + interval - time.monotonic()))
+
+    async def ws_event_loop(self):
+        while True:
+            msg = await self._ws.receive()
+
+            if msg.type == aiohttp.WSMsgType.TEXT:
+                if self.client.recorder is not None:
+                    self.client.recorder.write(msg.data)
+
+                load = self.client.frame_class.parse_raw(msg.data)
+                if load.op == OpCode.Hello:
+                    d = HeartBeat.parse_obj(load.d)
+                    self._heartbeat_interval = d.heartbeat_interval / 1000
+                    await self._auth()
+                elif load.op == OpCode.Dispatch:
+                    self._s = load.s
+                    if load.t == 'READY':
+                        d = Ready.parse_obj(load.d)
+                        self._session_id = d.session_id
+                        self._resuming = False
+                        Session.info(f'分片 {self.shard_id} 已连接: @{d.user.username} ({d.user.id})')
+                        self._start_heartbeat()
+                    elif load.t == 'RESUMED':
+                        self.client.metrics.resumes.labels(str(self.shard_id)).inc()
+                        Network.info(f'分片 {self.shard_id} 重连成功')
+                        self._resuming = False
+                        self._start_heartbeat()
+
+                    await self.client.register_event(load)
+                    # 事件进入队列后再保存序号，否则进程在此之间退出时 Resume 不会补发这个事件
+                    self._checkpoint()
+                elif load.op == OpCode.InvalidSession:
+                    if not self._resuming:
+                        Session.error('鉴权失败，可能是事件订阅参数有误')
+                        raise Exception('invalid session')
+
+                    Session.warn(f'分片 {self.shard_id} 的会话已失效，重新登录')
+                    self._invalidate()
+                    break
+                elif load.op == OpCode.HeartbeatAck:
+                    if self._heartbeat_sent is not None:
+                        self.latency = time.monotonic() - self._heartbeat_sent
+                        self.client.metrics.heartbeat_rtt.labels(str(self.shard_id)).observe(self.latency)
+                        self._heartbeat_sent = None
+                    self._heartbeat_acked.set()
+                    Network.info(f'收到心跳响应: {self.latency * 1000:.0f}ms' if self.latency is not None
+                                 else '收到心跳响应')
+                elif load.op == OpCode.Reconnect:
+                    Network.warn('收到重连请求')
+                    break
+            elif msg.type == aiohttp.WSMsgType.CLOSE:
+                if msg.data == 4009:
+                    Session.warn('连接超时，尝试重新登录')
+                elif msg.data >= 4900:
+                    Network.warn('内部错误，尝试重新登录')
+                else:
+                    continue
+
+                break
+            elif msg.type in (aiohttp.WSMsgType.CLOSED, aiohttp.WSMsgType.CLOSING):
+                if not self._closed:
+                    Network.info('连接已关闭，尝试重新登录')
+                break
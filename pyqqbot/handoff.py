@@ -0,0 +1,123 @@
+"""
+进程间交接网关会话，用于不中断事件接收的滚动发布：
+
+1. 新进程启动时连接旧进程监听的 unix socket，请求交接
+2. 旧进程停止监听并停止接收事件，将各分片的 session_id 与序号发给新进程
+3. 新进程使用这些会话 Resume，网关会补发交接期间的事件
+4. 旧进程处理完已接收的事件与正在运行的监听器后退出
+"""
+from typing import Any, Dict, List, Optional
+
+import asyncio
+import json
+import os
+
+from .session import SessionState
+from .logger import Session
+
+
+class HandoffServer:
+    """
+    在 unix socket 上等待新进程请求交接
+    """
+    path: str
+
+    def __init__(self, client: Any, path: str):
+        """
+        :param client: QQBot
+        :param path: unix socket 路径
+        """
+        self.client = client
+        self.path = path
+
+        self._server: Optional[asyncio.AbstractServer] = None
+        # 交接后旧进程处理完剩余事件时完成，_run 在此之前不能返回
+        self.drained: Optional[asyncio.Future] = None
+
+    async def start(self):
+        # 之前的进程异常退出时可能留下 socket 文件
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+        self._server = await asyncio.start_unix_server(self._handle, self.path)
+
+    async def stop(self):
+        if self._server is None:
+            return
+
+        self._server.close()
+        self._server = None
+
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        request = json.loads(await reader.readline() or b'{}')
+        if request.get('op') != 'handoff':
+            writer.write(json.dumps({'error': 'unknown op'}).encode() + b'\n')
+            writer.close()
+            return
+
+        Session.info('收到交接请求，停止接收事件')
+        # 分片断开后 _run 中的 gather 随即返回，需要在此之前设置
+        self.drained = asyncio.get_running_loop().create_future()
+
+        try:
+            # 先释放 socket 路径，新进程随后会在同一路径上监听
+            await self.stop()
+
+            states = {}
+            for shard in self.client.shards:
+                state = await shard.detach()
+                if state is not None:
+                    states[shard.shard_id] = state._asdict()
+
+            writer.write(json.dumps({'shards': states}).encode() + b'\n')
+            await writer.drain()
+            Session.info(f'已交接 {len(states)} 个分片的会话，等待正在处理的事件完成后退出')
+        finally:
+            writer.close()
+
+            # 即使交接失败也不再接收事件，处理完已接收的事件后退出
+            try:
+                await self.client.close()
+            finally:
+                self.drained.set_result(None)
+
+
+async def request_handoff(path: str, timeout: float = 30) -> Optional[Dict[int, SessionState]]:
+    """
+    请求旧进程交接会话
+    :param path: 旧进程监听的 unix socket 路径
+    :param timeout:
+    :return: 分片 ID -> 会话，没有旧进程时返回 None
+    """
+    try:
+        reader, writer = await asyncio.open_unix_connection(path)
+    except (FileNotFoundError, ConnectionRefusedError):
+        return None
+
+    try:
+        writer.write(json.dumps({'op': 'handoff'}).encode() + b'\n')
+        await writer.drain()
+        response = json.loads(await asyncio.wait_for(reader.readline(), timeout) or b'{}')
+
+        if not isinstance(response, dict) or 'shards' not in response:
+            error = response.get('error') if isinstance(response, dict) else None
+            Session.warn(f'交接失败: {error or "旧进程未响应"}')
+            return None
+
+        return {int(shard_id): SessionState(**state) for shard_id, state in response['shards'].items()}
+    except (asyncio.TimeoutError, ValueError, TypeError, ConnectionError) as e:
+        # 旧进程可能已经断开分片，这里不能抛出异常，否则没有进程继续接收事件，改为从会话存储恢复或重新登录
+        Session.warn(f'交接失败: {e!r}')
+        return None
+    finally:
+        writer.close()
+
+
+def handoff_path(path: str, shard_ids: Optional[List[int]] = None) -> str:
+    """
+    多进程运行时每个工作进程使用单独的 socket
+    """
+    return f'{path}.{shard_ids[0]}' if shard_ids else path
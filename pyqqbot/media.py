@@ -0,0 +1,120 @@
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Hashable, Tuple
+
+import asyncio
+import time
+
+from .models.api import UploadMediaFileResponse
+
+# 每条缓存除 file_info 外的估算开销（字节）
+ENTRY_OVERHEAD = 256
+
+
+class MediaCache:
+    """
+    富媒体上传缓存，以文件内容哈希与发送目标为键，在 ttl 内复用 file_info
+    """
+    max_entries: int
+    max_bytes: int
+
+    def __init__(self, max_entries: int = 1024, max_bytes: int = 4 * 1024 * 1024, margin: float = 10):
+        """
+        :param max_entries: 最大缓存条数
+        :param max_bytes: 缓存占用内存上限（估算值）
+        :param margin: 提前多少秒视为过期，避免发送时 file_info 刚好失效
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.margin = margin
+
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+
+        self._entries: OrderedDict[Hashable, Tuple[UploadMediaFileResponse, float, int]] = OrderedDict()
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+
+    def get(self, key: Hashable) -> UploadMediaFileResponse | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+
+        media, expires_at, size = entry
+        if expires_at and expires_at <= time.monotonic():
+            self._remove(key)
+            return None
+
+        self._entries.move_to_end(key)
+        return media
+
+    def put(self, key: Hashable, media: UploadMediaFileResponse):
+        if key in self._entries:
+            self._remove(key)
+
+        # ttl 为 0 时表示 file_info 长期有效
+        expires_at = time.monotonic() + media.ttl - self.margin if media.ttl else 0
+        size = len(media.file_info) + len(media.file_uuid) + ENTRY_OVERHEAD
+
+        self._entries[key] = (media, expires_at, size)
+        self.size += size
+
+        while self._entries and (len(self._entries) > self.max_entries or self.size > self.max_bytes):
+            self._remove(next(iter(self._entries)))
+
+    def _remove(self, key: Hashable):
+        media, expires_at, size = self._entries.pop(key)
+        self.size -= size
+
+    async def get_or_upload(self, key: Hashable,
+                            upload: Callable[[], Awaitable[UploadMediaFileResponse]]) -> UploadMediaFileResponse:
+        """
+        优先使用缓存，未命中时上传；同一文件同时发送时共用一次上传，
+        上传的任务被取消时由等待中的任务接替上传，取消不会传递给其他发送者
+        :param key:
+        :param upload:
+        :return:
+        """
+        while True:
+            media = self.get(key)
+            if media is not None:
+                self.hits += 1
+                return media
+
+            future = self._inflight.get(key)
+            if future is None:
+                break
+
+            # 结果为 None 表示上传的任务已被取消，重新检查并接替上传
+            media = await asyncio.shield(future)
+            if media is not None:
+                self.hits += 1
+                return media
+
+        self.misses += 1
+        future = self._inflight[key] = asyncio.get_running_loop().create_future()
+
+        try:
+            media = await upload()
+        except asyncio.CancelledError:
+            future.set_result(None)
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            # 没有其他等待者时避免产生未获取异常的警告
+            future.exception()
+            raise
+        else:
+            self.put(key, media)
+            future.set_result(media)
+            return media
+        finally:
+            del self._inflight[key]
+
+    def snapshot(self) -> dict:
+        return {
+            'entries': len(self._entries),
+            'bytes': self.size,
+            'inflight': len(self._inflight),
+            'hits': self.hits,
+            'misses': self.misses,
+        }
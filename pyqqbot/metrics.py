@@ -0,0 +1,326 @@
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from aiohttp import web
+
+import weakref
+
+from .logger import Network
+
+# 默认的耗时分桶（秒）
+DEFAULT_BUCKETS = (.0005, .001, .0025, .005, .01, .025, .05, .1, .25, .5, 1, 2.5, 5, 10)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = '') -> str:
+    labels = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        labels.append(extra)
+    return '{' + ','.join(labels) + '}' if labels else ''
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Metric:
+    """
+    指标基类，子指标按标签值缓存，记录时只有一次字典查找
+    """
+    type = 'untyped'
+
+    name: str
+    documentation: str
+    labelnames: Tuple[str, ...]
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[tuple, object] = {}
+
+    def labels(self, *values):
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f'{self.name} 需要标签 {self.labelnames}')
+            child = self._children[values] = self._new_child()
+        return child
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def samples(self) -> Iterable[Tuple[str, str, float]]:
+        """
+        :return: (指标名后缀, 标签, 值)
+        """
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.type}']
+        lines += [f'{self.name}{suffix}{labels} {_format_value(value)}' for suffix, labels, value in self.samples()]
+        return lines
+
+
+class _Value:
+    __slots__ = ('value',)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount: float = 1):
+        self.value += amount
+
+    def dec(self, amount: float = 1):
+        self.value -= amount
+
+    def set(self, value: float):
+        self.value = value
+
+
+class Counter(Metric):
+    """
+    只增不减的计数器
+    """
+    type = 'counter'
+
+    def _new_child(self):
+        return _Value()
+
+    def inc(self, amount: float = 1):
+        self.labels().inc(amount)
+
+    def samples(self):
+        for values, child in self._children.items():
+            yield '', _format_labels(self.labelnames, values), child.value
+
+
+class Gauge(Metric):
+    """
+    可增可减的指标，传入 function 时在导出时调用它取值，返回 标签值 -> 值
+    """
+    type = 'gauge'
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = (),
+                 function: Optional[Callable[[], Dict[tuple, float]]] = None):
+        super().__init__(name, documentation, labelnames)
+        self.function = function
+
+    def _new_child(self):
+        return _Value()
+
+    def set(self, value: float):
+        self.labels().set(value)
+
+    def samples(self):
+        values = {key: child.value for key, child in self._children.items()}
+        if self.function is not None:
+            values.update(self.function())
+
+        for key, value in values.items():
+            yield '', _format_labels(self.labelnames, key), value
+
+
+class FunctionCounter(Gauge):
+    """
+    导出时从已有的计数（例如队列的丢弃计数）取值的计数器，直接记录的计数与之相加
+    """
+    type = 'counter'
+
+    def inc(self, amount: float = 1):
+        self.labels().inc(amount)
+
+    def samples(self):
+        values = {key: child.value for key, child in self._children.items()}
+        if self.function is not None:
+            for key, value in self.function().items():
+                values[key] = values.get(key, 0) + value
+
+        for key, value in values.items():
+            yield '', _format_labels(self.labelnames, key), value
+
+
+class _Histogram:
+    __slots__ = ('buckets', 'counts', 'sum', 'count')
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Histogram(Metric):
+    """
+    分桶直方图，只记录各桶的计数，导出时再累加
+    """
+    type = 'histogram'
+
+    buckets: Tuple[float, ...]
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = (),
+                 buckets: Iterable[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self):
+        return _Histogram(self.buckets)
+
+    def observe(self, value: float):
+        self.labels().observe(value)
+
+    def samples(self):
+        for values, child in self._children.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), child.counts):
+                cumulative += count
+                yield '_bucket', _format_labels(self.labelnames, values, f'le="{_format_value(bound)}"'), cumulative
+
+            yield '_sum', _format_labels(self.labelnames, values), child.sum
+            yield '_count', _format_labels(self.labelnames, values), child.count
+
+
+class Registry:
+    """
+    指标注册表，导出为 Prometheus 文本格式
+    """
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f'指标已存在: {metric.name}')
+
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Iterable[str] = (),
+              function: Optional[Callable[[], Dict[tuple, float]]] = None) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames, function))
+
+    def histogram(self, name: str, documentation: str, labelnames: Iterable[str] = (),
+                  buckets: Iterable[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            lines += metric.render()
+        return '\n'.join(lines) + '\n'
+
+
+class Metrics(Registry):
+    """
+    QQBot 内置的运行指标
+    """
+    def __init__(self, namespace: str = 'pyqqbot'):
+        super().__init__()
+        self.namespace = namespace
+
+        # 从客户端状态读取的指标汇总所有绑定的客户端，同一份 Metrics 可以被多个 QQBot 共享
+        self._clients = weakref.WeakSet()
+
+        self.events_received = self.counter(
+            f'{namespace}_events_received_total', '收到的网关事件数', ['event'])
+        self.events_duplicated = self.counter(
+            f'{namespace}_events_duplicated_total', '重复收到而被丢弃的事件数', ['event'])
+        self.events_dropped = self.register(FunctionCounter(
+            f'{namespace}_events_dropped_total', '没有监听器或事件队列溢出而被丢弃的事件数', ['event'],
+            lambda: self._merge(queue.dropped_events for client in self._clients for queue in client.queues)))
+        self.queue_wait = self.histogram(
+            f'{namespace}_queue_wait_seconds', '事件在队列中等待的时间', ['consumer'])
+        self.handler_duration = self.histogram(
+            f'{namespace}_handler_duration_seconds', '监听器执行耗时', ['event', 'handler'])
+
+        self.http_duration = self.histogram(
+            f'{namespace}_http_request_duration_seconds', 'OpenAPI 请求耗时', ['method', 'route', 'status'])
+        self.upload_bytes = self.counter(
+            f'{namespace}_media_upload_bytes_total', '直接上传的富媒体文件字节数', ['route'])
+
+        self.reconnects = self.counter(
+            f'{namespace}_gateway_reconnects_total', '网关断线重连次数', ['shard'])
+        self.identifies = self.counter(
+            f'{namespace}_gateway_identifies_total', '网关 Identify 次数', ['shard'])
+        self.resumes = self.counter(
+            f'{namespace}_gateway_resumes_total', '网关 Resume 成功次数', ['shard'])
+        self.zombies = self.counter(
+            f'{namespace}_gateway_zombie_connections_total', '心跳超时而主动断开的连接数', ['shard'])
+        self.heartbeat_rtt = self.histogram(
+            f'{namespace}_heartbeat_rtt_seconds', '心跳往返时间', ['shard'],
+            buckets=(.01, .025, .05, .1, .25, .5, 1, 2.5, 5, 10))
+
+        self.loop_lag = self.histogram(
+            f'{namespace}_event_loop_lag_seconds', '事件循环调度延迟')
+        self.loop_blocks = self.counter(
+            f'{namespace}_event_loop_blocks_total', '事件循环被阻塞超过阈值的次数')
+        self.slow_handlers = self.counter(
+            f'{namespace}_slow_handlers_total', '运行时间超过阈值的监听器数', ['event', 'handler'])
+
+        self.gauge(f'{namespace}_queue_depth', '事件队列长度', ['consumer'], self._queue_depth)
+        self.register(FunctionCounter(f'{namespace}_media_cache_hits_total', '富媒体上传缓存命中数', (),
+                                      lambda: {(): sum(client.media_cache.hits for client in self._clients)}))
+        self.register(FunctionCounter(f'{namespace}_media_cache_misses_total', '富媒体上传缓存未命中数', (),
+                                      lambda: {(): sum(client.media_cache.misses for client in self._clients)}))
+
+        self._server: Optional[web.AppRunner] = None
+
+    def bind(self, client):
+        """
+        汇总客户端状态到导出时计算的指标，重复绑定同一客户端不会重复计数
+        :param client: QQBot
+        :return:
+        """
+        self._clients.add(client)
+
+    def _queue_depth(self) -> Dict[tuple, float]:
+        result = {}
+        for client in self._clients:
+            for i, queue in enumerate(client.queues):
+                result[i,] = result.get((i,), 0) + queue.qsize()
+        return result
+
+    @staticmethod
+    def _merge(counters) -> Dict[tuple, float]:
+        result = {}
+        for counter in counters:
+            for key, value in counter.items():
+                result[key,] = result.get((key,), 0) + value
+        return result
+
+    async def start_server(self, host: str = '127.0.0.1', port: int = 9464):
+        """
+        启动 HTTP 服务，在 /metrics 导出指标
+        :param host:
+        :param port:
+        :return:
+        """
+        async def handle(request: web.Request):
+            return web.Response(body=self.render().encode(), headers={'Content-Type': CONTENT_TYPE})
+
+        app = web.Application()
+        app.router.add_get('/metrics', handle)
+
+        self._server = web.AppRunner(app, access_log=None)
+        await self._server.setup()
+        await web.TCPSite(self._server, host, port).start()
+        Network.info(f'指标服务已启动: http://{host}:{port}/metrics')
+
+    async def stop_server(self):
+        if self._server is not None:
+            await self._server.cleanup()
+            self._server = None
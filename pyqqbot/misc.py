@@ -4,6 +4,7 @@ from typing import List
 import inspect
 
 Parameter = namedtuple("Parameter", ["name", "annotation", "default"])
+HandlerPlan = namedtuple("HandlerPlan", ["callback", "injectors", "name"])
 
 
 def argument_signature(callable_target) -> List[Parameter]:
@@ -19,3 +19,16 @@ class UploadMediaFileResponse(BaseModel):
     file_uuid: str
     file_info: str
     ttl: int
+
+
+class SessionStartLimit(BaseModel):
+    total: int
+    remaining: int
+    reset_after: int
+    max_concurrency: int
+
+
+class GetGatewayBotResponse(BaseModel):
+    url: str
+    shards: int
+    session_start_limit: SessionStartLimit
@@ -1,6 +1,14 @@
 from pydantic import BaseModel
 from typing import Optional, Union
 
+import json
+
+try:
+    import orjson
+    _loads = orjson.loads
+except ImportError:
+    _loads = json.loads
+
 
 class HeartBeat(BaseModel):
     heartbeat_interval: int
@@ -22,3 +30,38 @@ class Load(BaseModel):
         d: Optional[Union[dict, int]] = None
     ):
         super().__init__(op=op, s=s, t=t, id=id, d=d)
+
+
+class Frame:
+    """
+    网关帧，只解析一次 JSON，不进行模型校验，d 保持原始数据
+    """
+    __slots__ = ('op', 's', 't', 'id', 'd')
+
+    op: int
+    s: Optional[int]
+    t: Optional[str]
+    id: Optional[str]
+    d: Optional[Union[dict, int]]
+
+    def __init__(
+        self,
+        op: int,
+        s: Optional[int] = None,
+        t: Optional[str] = None,
+        id: Optional[str] = None,
+        d: Optional[Union[dict, int]] = None
+    ):
+        self.op = op
+        self.s = s
+        self.t = t
+        self.id = id
+        self.d = d
+
+    def __repr__(self):
+        return f'<Frame op={self.op} s={self.s} t={self.t}>'
+
+    @classmethod
+    def parse_raw(cls, data: Union[str, bytes]) -> 'Frame':
+        load = _loads(data)
+        return cls(load['op'], load.get('s'), load.get('t'), load.get('id'), load.get('d'))
@@ -0,0 +1,247 @@
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+
+import threading
+import tracemalloc
+import cProfile
+import pstats
+import time
+import io
+import gc
+import sys
+
+from pydantic import BaseModel
+
+from .entities.components import MessageComponent
+from .event.models import Event
+
+
+# 内存快照中忽略的分配位置：tracemalloc 自身与模块导入
+IGNORED_FILES = frozenset((
+    tracemalloc.__file__,
+    '<frozen importlib._bootstrap>',
+    '<frozen importlib._bootstrap_external>',
+))
+
+
+class StackSampler:
+    """
+    采样分析器，另开线程定时采集事件循环线程的调用栈，
+    结果为 flamegraph.pl / speedscope 可以直接读取的折叠栈格式
+    """
+    interval: float
+
+    def __init__(self, thread_id: int, interval: float = 0.005):
+        """
+        :param thread_id: 被采样的线程，一般为事件循环所在线程
+        :param interval: 采样间隔（秒）
+        """
+        self.thread_id = thread_id
+        self.interval = interval
+
+        self.samples = 0
+        self.stacks: Counter = Counter()
+        self.started_at = 0.0
+
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        self.started_at = time.monotonic()
+        self._thread = threading.Thread(target=self._run, name='pyqqbot-sampler', daemon=True)
+        self._thread.start()
+
+    def stop(self) -> str:
+        """
+        停止采样
+        :return: 折叠栈
+        """
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+
+        return self.collapsed()
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                break
+
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f'{code.co_name} ({code.co_filename}:{code.co_firstlineno})')
+                frame = frame.f_back
+
+            stack.reverse()
+            self.stacks[';'.join(stack)] += 1
+            self.samples += 1
+
+    def collapsed(self) -> str:
+        return ''.join(f'{stack} {count}\n' for stack, count in self.stacks.most_common())
+
+
+class FunctionProfiler:
+    """
+    cProfile 分析器，需要在被分析的线程（事件循环线程）中启动与停止
+    """
+    def __init__(self):
+        self.started_at = 0.0
+        self._profile = cProfile.Profile()
+
+    def start(self):
+        self.started_at = time.monotonic()
+        self._profile.enable()
+
+    def stop(self, sort: str = 'cumulative', limit: int = 100) -> str:
+        """
+        停止分析
+        :param sort: pstats 排序方式
+        :param limit: 输出的函数数量
+        :return: pstats 文本报告
+        """
+        self._profile.disable()
+
+        output = io.StringIO()
+        pstats.Stats(self._profile, stream=output).sort_stats(sort).print_stats(limit)
+        return output.getvalue()
+
+
+def handler_ranges(client: Any) -> List[Tuple[str, str, int, int]]:
+    """
+    获取各监听器代码所在的文件与行号范围，用于将内存分配归属到监听器
+    :param client: QQBot
+    :return: [(监听器名称, 文件, 起始行, 结束行)]
+    """
+    ranges = []
+    for plans in client._handlers.values():
+        for plan in plans:
+            code = getattr(plan.callback, '__code__', None)
+            if code is None:
+                continue
+
+            lines = [line for _, _, line in code.co_lines() if line is not None]
+            ranges.append((plan.name, code.co_filename, code.co_firstlineno, max(lines, default=code.co_firstlineno)))
+
+    return ranges
+
+
+def count_models() -> Counter:
+    """
+    统计存活的事件、实体模型与消息组件数量
+    :return: 类型名称 -> 数量
+    """
+    counts = Counter()
+    for obj in gc.get_objects():
+        if isinstance(obj, (BaseModel, MessageComponent, Event)):
+            counts[type(obj).__qualname__] += 1
+
+    return counts
+
+
+class HeapTracker:
+    """
+    基于 tracemalloc 的内存快照对比，按监听器与实体模型类型分组。
+    快照与对比在堆较大时耗时可达数秒，可以在线程中调用，避免阻塞事件循环导致心跳超时
+    """
+    frames: int
+
+    def __init__(self, client: Any, frames: int = 32):
+        """
+        :param client: QQBot
+        :param frames: 每次分配记录的调用栈深度，越深越容易归属到监听器，开销也越大
+        """
+        self.client = client
+        self.frames = frames
+
+        self._snapshot: Optional[tracemalloc.Snapshot] = None
+        self._models: Counter = Counter()
+        self._lock = threading.Lock()
+
+    @property
+    def tracing(self) -> bool:
+        return tracemalloc.is_tracing()
+
+    def start(self):
+        with self._lock:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(self.frames)
+
+            self._snapshot = self._take_snapshot()
+            self._models = count_models()
+
+    def stop(self):
+        with self._lock:
+            tracemalloc.stop()
+            self._snapshot = None
+            self._models = Counter()
+
+    @staticmethod
+    def _take_snapshot() -> tracemalloc.Snapshot:
+        # 不使用 filter_traces：它逐条匹配文件名，在数十万条记录上要数分钟，改为在分组后的统计上过滤
+        return tracemalloc.take_snapshot()
+
+    @staticmethod
+    def _ignored(stat: tracemalloc.StatisticDiff) -> bool:
+        return stat.traceback[-1].filename in IGNORED_FILES
+
+    def snapshot(self, limit: int = 30, ranges: Optional[List[Tuple[str, str, int, int]]] = None) -> dict:
+        """
+        与上一次快照对比，并以本次快照作为下一次对比的基准
+        :param limit: 按代码行输出的条目数
+        :param ranges: 监听器代码范围，在线程中调用时应先在事件循环中通过 handler_ranges 获取
+        :return:
+        """
+        if self._snapshot is None:
+            self.start()
+
+        if ranges is None:
+            ranges = handler_ranges(self.client)
+
+        with self._lock:
+            return self._compare(limit, ranges)
+
+    def _compare(self, limit: int, ranges: List[Tuple[str, str, int, int]]) -> dict:
+        snapshot = self._take_snapshot()
+        models = count_models()
+
+        handlers: Dict[str, Dict[str, int]] = {}
+        for stat in snapshot.compare_to(self._snapshot, 'traceback'):
+            if not stat.size_diff and not stat.count_diff or self._ignored(stat):
+                continue
+
+            group = handlers.setdefault(self._find_handler(stat.traceback, ranges), {'size_diff': 0, 'count_diff': 0})
+            group['size_diff'] += stat.size_diff
+            group['count_diff'] += stat.count_diff
+
+        lines = [
+            {'line': str(stat.traceback[-1]), 'size_diff': stat.size_diff, 'count_diff': stat.count_diff,
+             'size': stat.size, 'count': stat.count}
+            for stat in [stat for stat in snapshot.compare_to(self._snapshot, 'lineno') if not self._ignored(stat)][:limit]
+        ]
+
+        result = {
+            'traced': tracemalloc.get_traced_memory()[0],
+            'handlers': dict(sorted(handlers.items(), key=lambda item: -abs(item[1]['size_diff']))),
+            'models': {
+                name: {'count': count, 'count_diff': count - self._models.get(name, 0)}
+                for name, count in sorted(models.items(), key=lambda item: -(item[1] - self._models.get(item[0], 0)))
+                if count != self._models.get(name, 0)
+            },
+            'lines': lines,
+        }
+
+        self._snapshot = snapshot
+        self._models = models
+        return result
+
+    @staticmethod
+    def _find_handler(traceback: tracemalloc.Traceback, ranges: List[Tuple[str, str, int, int]]) -> str:
+        # 从最近的帧开始查找，第一个落在监听器代码内的帧即为归属
+        for frame in reversed(traceback):
+            for name, filename, first, last in ranges:
+                if frame.filename == filename and first <= frame.lineno <= last:
+                    return name
+
+        return '(other)'
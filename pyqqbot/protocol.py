@@ -1,60 +1,162 @@
-from typing import Union, List
+from typing import Awaitable, Callable, Dict, Union, List, Optional
 
 import aiohttp
 import asyncio
-import base64
+import weakref
+import time
 import json
 
-from .entities.components import MessageType
+from .entities.components import AttachmentType, MessageType
 from .entities import Attachment, DirectMessage, MessageComponent, MessageParser, GroupMessage
 from .models.api import *
+from .ratelimit import RateLimiter, route_template
+from .retry import RetryPolicy, CircuitBreaker, CircuitOpenError
+from .media import MediaCache
+from .metrics import Metrics
+
+IDEMPOTENT_METHODS = {'GET', 'HEAD', 'PUT', 'DELETE', 'OPTIONS'}
+
+OPENAPI_URL = 'https://api.sgroup.qq.com'
+TOKEN_URL = 'https://bots.qq.com/app/getAppAccessToken'
 
 
 class HttpClient:
     app_id: int
+    rate_limiter: RateLimiter | None
+    retry_policy: RetryPolicy
+    metrics: Metrics | None
 
     _access_token: str | None
     _openapi_url: str
     _session: aiohttp.ClientSession | None
+    _breakers: Dict[str, CircuitBreaker]
 
-    def __init__(self, app_id: int, access_token: str, openapi_url: str, session: aiohttp.ClientSession):
+    def __init__(self, app_id: int, access_token: str, openapi_url: str, session: aiohttp.ClientSession,
+                 rate_limiter: Optional[RateLimiter] = None, retry_policy: Optional[RetryPolicy] = None,
+                 metrics: Optional[Metrics] = None):
         self.app_id = app_id
+        self.rate_limiter = rate_limiter
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.metrics = metrics
         self._access_token = access_token
         self._openapi_url = openapi_url
         self._session = session
+        self._breakers = {}
+
+    def get_breaker(self, route: str) -> CircuitBreaker:
+        breaker = self._breakers.get(route)
+        if breaker is None:
+            breaker = self._breakers[route] = CircuitBreaker()
+        return breaker
+
+    async def request(self, method, endpoint, params=None, data=None, retry: Optional[bool] = None,
+                      headers: Optional[dict] = None) -> dict:
+        """
+        发送请求，失败时按重试策略重试
+        :param method:
+        :param endpoint:
+        :param params:
+        :param data: 请求体，传入函数时每次请求都会调用它生成新的请求体（例如流式请求体）
+        :param retry: 是否允许重试，为空时仅重试幂等请求
+        :param headers: 额外的请求头
+        :return:
+        """
+        if retry is None:
+            retry = method in IDEMPOTENT_METHODS
+
+        route, _ = route_template(endpoint)
+        breaker = self.get_breaker(route)
+        retries = self.retry_policy.retries if retry else 0
+
+        for attempt in range(retries + 1):
+            if not breaker.allow():
+                raise CircuitOpenError(route, breaker.retry_after())
+
+            started = None
+
+            try:
+                if self.rate_limiter is not None:
+                    await self.rate_limiter.acquire(endpoint)
+
+                started = time.perf_counter()
+                async with self._session.request(method, f'{self._openapi_url}{endpoint}', params=params,
+                                                 data=data() if callable(data) else data, headers={
+                    'Authorization': self._access_token,
+                    'X-Union-Appid': str(self.app_id),
+                    'Content-Type': 'application/json',
+                    **(headers or {}),
+                }) as resp:
+                    body = await resp.read()
+            except (aiohttp.ClientConnectionError, aiohttp.ClientPayloadError, asyncio.TimeoutError):
+                self._observe(method, route, 'error', started)
+                breaker.record_failure()
+                if attempt == retries:
+                    raise
+                await asyncio.sleep(self.retry_policy.delay(attempt))
+                continue
+            except BaseException:
+                breaker.release()
+                raise
+
+            self._observe(method, route, str(resp.status), started)
+
+            if resp.status >= 500:
+                breaker.record_failure()
+            else:
+                breaker.record_success()
+
+            if resp.status in self.retry_policy.statuses and attempt < retries:
+                await asyncio.sleep(self.retry_policy.delay(attempt, self._retry_after(resp)))
+                continue
 
-    async def request(self, method, endpoint, params=None, data=None) -> dict:
-        async with self._session.request(method, f'{self._openapi_url}{endpoint}', params=params, data=data, headers={
-            'Authorization': self._access_token,
-            'X-Union-Appid': str(self.app_id),
-            'Content-Type': 'application/json'
-        }) as resp:
-            print(await resp.text())
             resp.raise_for_status()
-            return await resp.json()
+            return json.loads(body) if body else {}
+
+    def _observe(self, method: str, route: str, status: str, started: Optional[float]):
+        if self.metrics is not None and started is not None:
+            self.metrics.http_duration.labels(method, route, status).observe(time.perf_counter() - started)
+
+    @staticmethod
+    def _retry_after(resp: aiohttp.ClientResponse) -> Optional[float]:
+        try:
+            return float(resp.headers['Retry-After'])
+        except (KeyError, ValueError):
+            return None
 
     async def get(self, endpoint, params=None) -> dict:
         return await self.request('GET', endpoint, params=params)
 
-    async def post(self, endpoint, data=None) -> dict:
-        return await self.request('POST', endpoint, data=json.dumps(data))
+    async def post(self, endpoint, data=None, retry: bool = False) -> dict:
+        return await self.request('POST', endpoint, data=json.dumps(data), retry=retry)
 
 
 class QQBotProtocol:
     http: HttpClient
+    rate_limiter: RateLimiter | None
+    media_cache: MediaCache
+    metrics: Metrics
     app_id: int
     client_secret: str
 
     _access_token: str | None
     _openapi_url: str
+    _token_url: str
     _session: aiohttp.ClientSession | None
 
-    def __init__(self, app_id: int, client_secret: str):
+    def __init__(self, app_id: int, client_secret: str, openapi_url: str = OPENAPI_URL, token_url: str = TOKEN_URL):
         self.app_id = app_id
         self.client_secret = client_secret
 
+        self.media_cache = MediaCache()
+        self.metrics = Metrics()
+        # 每个目标同时上传的文件数
+        self.upload_concurrency = 4
+        self._upload_semaphores: weakref.WeakValueDictionary[tuple, asyncio.Semaphore] = \
+            weakref.WeakValueDictionary()
+
         self._access_token = None
-        self._openapi_url = 'https://api.sgroup.qq.com'
+        self._openapi_url = openapi_url
+        self._token_url = token_url
         self._session = None
 
     async def _get_app_access_token(self) -> GetAppAccessTokenResponse:
@@ -62,7 +164,7 @@ class QQBotProtocol:
         获取接口凭证
         :return:
         """
-        async with self._session.post('https://bots.qq.com/app/getAppAccessToken', headers={
+        async with self._session.post(self._token_url, headers={
             'Content-Type': 'application/json'
         }, data=json.dumps({
             'appId': str(self.app_id),
@@ -80,35 +182,75 @@ class QQBotProtocol:
         result = await self.http.get('/gateway')
         return result['url']
 
-    async def send_c2c_message(self, source: DirectMessage,
-                               content: Union[str, MessageComponent, List[MessageComponent]]) -> SendMessageResponse:
+    async def _get_gateway_bot(self) -> GetGatewayBotResponse:
         """
-        发送单聊消息
+        获取带分片信息的 WSS 接入点
+        :return:
+        """
+        result = await self.http.get('/gateway/bot')
+        return GetGatewayBotResponse(**result)
+
+    async def _send_message(self, endpoint: str, source: Union[DirectMessage, GroupMessage],
+                            content: Union[str, MessageComponent, List[MessageComponent]],
+                            upload: Callable[[Attachment], Awaitable[UploadMediaFileResponse]]) -> SendMessageResponse:
+        """
+        发送消息，消息中的富媒体文件并发上传；包含多个富媒体文件时，
+        第一条消息携带文字与第一个文件，其余文件依次递增 msg_seq 单独发送
+        :param endpoint:
         :param source:
         :param content:
-        :return:
+        :param upload:
+        :return: 第一条消息的发送结果
         """
         if isinstance(content, MessageComponent):
             content = [content]
 
+        medias = []
         if isinstance(content, list):
             message = MessageParser.to_dict(content)
-
-            for i, component in enumerate(content):
-                if isinstance(component, Attachment):
-                    media = await self.upload_c2c_media_file(source.author.member_openid, attachment=component)
-                    message['media'] = media.dict()
-                    message['msg_type'] = MessageType.MEDIA.value
+            medias = await asyncio.gather(*(
+                upload(component) for component in content if isinstance(component, Attachment)
+            ))
         else:
             message = {'content': content}
 
-        result = await self.http.post(f'/v2/users/{source.author.member_openid}/messages', data={
-            'msg_id': source.id,
-            'msg_type': MessageType.TEXT.value,
-            'msg_seq': source.msg_seq,
-            **message,
-        })
-        return SendMessageResponse(**result)
+        messages = [message]
+        if medias:
+            message['media'] = {'file_info': medias[0].file_info}
+            message['msg_type'] = MessageType.MEDIA.value
+            messages += [
+                {'media': {'file_info': media.file_info}, 'msg_type': MessageType.MEDIA.value}
+                for media in medias[1:]
+            ]
+
+        results = []
+        for i, message in enumerate(messages):
+            if i:
+                source.msg_seq += 1
+
+            # 消息通过 msg_id 与 msg_seq 去重，可以安全重试
+            results.append(await self.http.post(endpoint, retry=True, data={
+                'msg_id': source.id,
+                'msg_type': MessageType.TEXT.value,
+                'msg_seq': source.msg_seq,
+                **message,
+            }))
+
+        return SendMessageResponse(**results[0])
+
+    async def send_c2c_message(self, source: DirectMessage,
+                               content: Union[str, MessageComponent, List[MessageComponent]]) -> SendMessageResponse:
+        """
+        发送单聊消息
+        :param source:
+        :param content:
+        :return:
+        """
+        openid = source.author.member_openid
+        return await self._send_message(
+            f'/v2/users/{openid}/messages', source, content,
+            lambda attachment: self.upload_c2c_media_file(openid, attachment=attachment)
+        )
 
     async def send_group_message(self, source: GroupMessage,
                                  content: Union[str, MessageComponent, List[MessageComponent]]) -> SendMessageResponse:
@@ -118,27 +260,11 @@ class QQBotProtocol:
         :param content:
         :return:
         """
-        if isinstance(content, MessageComponent):
-            content = [content]
-
-        if isinstance(content, list):
-            message = MessageParser.to_dict(content)
-
-            for i, component in enumerate(content):
-                if isinstance(component, Attachment):
-                    media = await self.upload_group_media_file(source.group_openid, attachment=component)
-                    message['media'] = media.dict()
-                    message['msg_type'] = MessageType.MEDIA.value
-        else:
-            message = {'content': content}
-
-        result = await self.http.post(f'/v2/groups/{source.group_openid}/messages', data={
-            'msg_id': source.id,
-            'msg_type': MessageType.TEXT.value,
-            'msg_seq': source.msg_seq,
-            **message,
-        })
-        return SendMessageResponse(**result)
+        group_openid = source.group_openid
+        return await self._send_message(
+            f'/v2/groups/{group_openid}/messages', source, content,
+            lambda attachment: self.upload_group_media_file(group_openid, attachment=attachment)
+        )
 
     async def _upload_media_file(self, endpoint: str, data: dict) -> UploadMediaFileResponse:
         """
@@ -147,57 +273,109 @@ class QQBotProtocol:
         :param data:
         :return:
         """
-        result = await self.http.post(endpoint, data=data)
+        result = await self.http.post(endpoint, data=data, retry=True)
         return UploadMediaFileResponse(**result)
 
-    async def upload_c2c_media_file(self, openid: str, url: str = None, attachment: Attachment = None,
-                                    srv_send_msg: bool = False) -> UploadMediaFileResponse:
+    async def _upload_media_stream(self, endpoint: str, data: dict, attachment: Attachment) -> UploadMediaFileResponse:
         """
-        上传单聊富媒体文件
-        :param openid:
+        流式上传富媒体文件，文件内容分块编码后直接写入请求体
+        :param endpoint:
+        :param data:
+        :param attachment:
+        :return:
+        """
+        prefix = json.dumps(data)[:-1].encode() + b', "file_data": "'
+        suffix = b'"}'
+
+        async def body():
+            yield prefix
+            for chunk in attachment.iter_base64():
+                yield chunk
+            yield suffix
+
+        result = await self.http.request('POST', endpoint, data=body, retry=True, headers={
+            'Content-Length': str(len(prefix) + attachment.base64_size() + len(suffix)),
+        })
+        self.metrics.upload_bytes.labels(route_template(endpoint)[0]).inc(attachment.file_size())
+        return UploadMediaFileResponse(**result)
+
+    async def _upload_attachment(self, endpoint: str, scope: tuple, url: str = None, attachment: Attachment = None,
+                                 srv_send_msg: bool = False,
+                                 file_type: Optional[AttachmentType] = None) -> UploadMediaFileResponse:
+        """
+        上传富媒体文件，直接上传的文件按内容哈希与目标缓存 file_info
+        :param endpoint:
+        :param scope: 发送目标，file_info 只能在同一目标内复用
         :param url:
         :param attachment:
         :param srv_send_msg:
+        :param file_type: 文件类型，通过 url 上传时必须指定
         :return:
         """
+        if url is None and attachment is None:
+            raise ValueError('url 和 attachment 不能同时为空')
+
+        if url is not None:
+            if file_type is None:
+                raise ValueError('通过 url 上传时必须指定 file_type')
+
+            return await self._upload_media_file(endpoint, {
+                'file_type': AttachmentType(file_type).value,
+                'url': url,
+                'srv_send_msg': srv_send_msg,
+            })
+
         data = {
             'file_type': attachment.type.value,
             'srv_send_msg': srv_send_msg,
         }
 
-        if url is not None:
-            data['url'] = url
-        elif attachment is not None:
-            data['file_data'] = base64.b64encode(attachment.file).decode()
-        else:
-            raise ValueError('url 和 attachment 不能同时为空')
+        async def upload():
+            semaphore = self._upload_semaphores.get(scope)
+            if semaphore is None:
+                semaphore = self._upload_semaphores[scope] = asyncio.Semaphore(self.upload_concurrency)
 
-        return await self._upload_media_file(f'/v2/users/{openid}/files', {
-            'file_type': attachment.type.value,
-            'url': url,
-            'srv_send_msg': srv_send_msg,
-        })
+            async with semaphore:
+                return await self._upload_media_stream(endpoint, data, attachment)
+
+        # srv_send_msg 为 True 时文件会直接发送到目标，不能复用
+        if srv_send_msg:
+            return await upload()
+
+        # 大文件计算哈希耗时较长，未缓存时在线程中计算，避免阻塞事件循环
+        digest = attachment.cached_digest()
+        if digest is None:
+            digest = await asyncio.get_running_loop().run_in_executor(None, attachment.digest)
+
+        key = (scope, attachment.type.value, digest)
+        return await self.media_cache.get_or_upload(key, upload)
+
+    async def upload_c2c_media_file(self, openid: str, url: str = None, attachment: Attachment = None,
+                                    srv_send_msg: bool = False,
+                                    file_type: Optional[AttachmentType] = None) -> UploadMediaFileResponse:
+        """
+        上传单聊富媒体文件
+        :param openid:
+        :param url:
+        :param attachment:
+        :param srv_send_msg:
+        :param file_type: 文件类型，通过 url 上传时必须指定
+        :return:
+        """
+        return await self._upload_attachment(f'/v2/users/{openid}/files', ('c2c', openid),
+                                             url, attachment, srv_send_msg, file_type)
 
     async def upload_group_media_file(self, group_openid: str, url: str = None, attachment: Attachment = None,
-                                      srv_send_msg: bool = False) -> UploadMediaFileResponse:
+                                      srv_send_msg: bool = False,
+                                      file_type: Optional[AttachmentType] = None) -> UploadMediaFileResponse:
         """
         上传群聊富媒体文件
         :param group_openid:
         :param url:
         :param attachment:
         :param srv_send_msg:
+        :param file_type: 文件类型，通过 url 上传时必须指定
         :return:
         """
-        data = {
-            'file_type': attachment.type.value,
-            'srv_send_msg': srv_send_msg,
-        }
-
-        if url is not None:
-            data['url'] = url
-        elif attachment is not None:
-            data['file_data'] = base64.b64encode(attachment.file).decode()
-        else:
-            raise ValueError('url 和 attachment 不能同时为空')
-
-        return await self._upload_media_file(f'/v2/groups/{group_openid}/files', data)
+        return await self._upload_attachment(f'/v2/groups/{group_openid}/files', ('group', group_openid),
+                                             url, attachment, srv_send_msg, file_type)
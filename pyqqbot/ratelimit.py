@@ -0,0 +1,168 @@
+from typing import Dict, Optional, Tuple
+
+import asyncio
+import time
+import re
+
+ROUTE_PATTERN = re.compile(r'/(groups|users|channels|dms|guilds)/([^/?]+)')
+# 目标之后的路径中，除小写单词（messages、members 等集合名称）外的段都视为 ID
+COLLECTION_PATTERN = re.compile(r'[a-z_]+')
+ROUTE_PLACEHOLDERS = {
+    'groups': '{group_openid}',
+    'users': '{openid}',
+    'channels': '{channel_id}',
+    'dms': '{guild_id}',
+    'guilds': '{guild_id}',
+}
+
+
+def route_template(endpoint: str) -> Tuple[str, Optional[str]]:
+    """
+    将接口地址转换为路由模板，并取出其中的目标（群、用户、子频道等）；
+    目标之后的消息、成员等 ID 与查询参数同样去除，否则每条消息都会产生单独的令牌桶、熔断器与指标标签
+    :param endpoint: 例如 /channels/xxx/messages/yyy
+    :return: 例如 ('/channels/{channel_id}/messages/{id}', 'xxx')
+    """
+    endpoint = endpoint.partition('?')[0]
+
+    match = ROUTE_PATTERN.search(endpoint)
+    if match is None:
+        return endpoint, None
+
+    kind, target = match.groups()
+    rest = ''.join(
+        f'/{segment}' if COLLECTION_PATTERN.fullmatch(segment) else '/{id}'
+        for segment in endpoint[match.end():].split('/')[1:]
+    )
+    return f'{endpoint[:match.start()]}/{kind}/{ROUTE_PLACEHOLDERS[kind]}{rest}', target
+
+
+class TokenBucket:
+    """
+    令牌桶，等待令牌的调用者按先后顺序获取令牌
+    """
+    rate: float
+    capacity: float
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        """
+        :param rate: 每秒补充的令牌数
+        :param capacity: 令牌桶容量，即允许的突发请求数，默认与 rate 相同
+        """
+        self.rate = rate
+        self.capacity = capacity or max(rate, 1)
+
+        self.tokens = self.capacity
+        self.waiting = 0
+
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self):
+        self.waiting += 1
+
+        try:
+            async with self._lock:
+                self._refill()
+                if self.tokens < 1:
+                    await asyncio.sleep((1 - self.tokens) / self.rate)
+                    self._refill()
+
+                self.tokens -= 1
+        finally:
+            self.waiting -= 1
+
+    def idle(self) -> bool:
+        """
+        令牌桶已满且没有等待者
+        """
+        self._refill()
+        return not self.waiting and self.tokens >= self.capacity
+
+    def snapshot(self) -> dict:
+        self._refill()
+        return {
+            'rate': self.rate,
+            'capacity': self.capacity,
+            'tokens': self.tokens,
+            'waiting': self.waiting,
+        }
+
+
+class RateLimiter:
+    """
+    OpenAPI 请求限流器，依次经过目标、路由与全局三级令牌桶
+    """
+    global_rate: Optional[float]
+    route_rate: Optional[float]
+    target_rate: Optional[float]
+    routes: Dict[str, float]
+
+    def __init__(self, global_rate: Optional[float] = None, route_rate: Optional[float] = None,
+                 target_rate: Optional[float] = None, routes: Optional[Dict[str, float]] = None,
+                 max_targets: int = 10000):
+        """
+        默认不限流，各机器人的配额不同，请按开放平台后台的配额设置
+        :param global_rate: 全局每秒请求数，为空时不限制
+        :param route_rate: 每个路由模板的每秒请求数，为空时不限制
+        :param target_rate: 每个目标的每秒请求数，为空时不限制
+        :param routes: 路由模板 -> 每秒请求数，覆盖 route_rate
+        :param max_targets: 目标令牌桶数量超过该值时清理空闲的令牌桶
+        """
+        self.global_rate = global_rate
+        self.route_rate = route_rate
+        self.target_rate = target_rate
+        self.routes = routes or {}
+        self.max_targets = max_targets
+
+        self._global = TokenBucket(global_rate) if global_rate else None
+        self._routes: Dict[str, TokenBucket] = {}
+        self._targets: Dict[Tuple[str, str], TokenBucket] = {}
+
+    async def acquire(self, endpoint: str):
+        """
+        等待直到允许请求该接口
+        :param endpoint:
+        :return:
+        """
+        route, target = route_template(endpoint)
+
+        if target is not None and self.target_rate:
+            bucket = self._targets.get((route, target))
+            if bucket is None:
+                if len(self._targets) >= self.max_targets:
+                    self._purge()
+                bucket = self._targets[route, target] = TokenBucket(self.target_rate)
+            await bucket.acquire()
+
+        rate = self.routes.get(route, self.route_rate)
+        if rate:
+            bucket = self._routes.get(route)
+            if bucket is None:
+                bucket = self._routes[route] = TokenBucket(rate)
+            await bucket.acquire()
+
+        if self._global is not None:
+            await self._global.acquire()
+
+    def _purge(self):
+        for key in [key for key, bucket in self._targets.items() if bucket.idle()]:
+            del self._targets[key]
+
+    def snapshot(self) -> dict:
+        """
+        获取各令牌桶的状态，用于监控
+        :return:
+        """
+        return {
+            'global': self._global.snapshot() if self._global is not None else None,
+            'routes': {route: bucket.snapshot() for route, bucket in self._routes.items()},
+            'targets': {
+                f'{route}:{target}': bucket.snapshot() for (route, target), bucket in self._targets.items()
+            },
+        }
@@ -0,0 +1,221 @@
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Iterator, List, Optional, Tuple, Union
+
+import asyncio
+import gzip
+import time
+import os
+
+from .models.ws import OpCode
+from .logger import Event as EventLogger
+
+FILE_PREFIX = 'gateway-'
+FILE_SUFFIX = '.log.gz'
+
+
+class Recorder:
+    """
+    网关流量录制器，将收到的原始帧与接收时间追加到 gzip 压缩日志中，按大小轮转。
+    每行格式为 `接收时间\\t原始帧`，压缩与写入在单独的线程中依次进行，不阻塞事件循环
+    """
+    directory: str
+    max_bytes: int
+    backup_count: int
+
+    def __init__(self, directory: str, max_bytes: int = 64 * 1024 * 1024, backup_count: int = 10,
+                 flush_interval: float = 1.0, compresslevel: int = 6):
+        """
+        :param directory: 日志目录
+        :param max_bytes: 单个日志文件写入的（未压缩）字节数上限，超过后轮转
+        :param backup_count: 保留的日志文件数量
+        :param flush_interval: 缓冲写入的最长间隔（秒）
+        :param compresslevel: gzip 压缩等级
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.flush_interval = flush_interval
+        self.compresslevel = compresslevel
+
+        self.frames = 0
+
+        self._file: Optional[gzip.GzipFile] = None
+        self._written = 0
+        self._buffer: List[bytes] = []
+        self._flushed_at = time.monotonic()
+        self._opened_ns = 0
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+        os.makedirs(directory, exist_ok=True)
+
+    def write(self, data: Union[str, bytes], timestamp: Optional[float] = None):
+        """
+        记录一帧，写入会先进入缓冲区，按时间间隔批量落盘
+        :param data: 原始帧
+        :param timestamp: 接收时间，默认为当前时间
+        :return:
+        """
+        if isinstance(data, str):
+            data = data.encode()
+
+        # JSON 字符串内的换行必然经过转义，这里只会替换空白字符
+        if b'\n' in data:
+            data = data.replace(b'\n', b' ')
+
+        self._buffer.append(b'%.6f\t%s\n' % (timestamp or time.time(), data))
+        self.frames += 1
+
+        if time.monotonic() - self._flushed_at >= self.flush_interval:
+            self.flush(wait=False)
+
+    def flush(self, wait: bool = True):
+        """
+        写入缓冲区中的帧
+        :param wait: 是否等待写入完成，为 False 时在后台线程中写入后立即返回
+        :return:
+        """
+        self._flushed_at = time.monotonic()
+        if not self._buffer:
+            return
+
+        chunk = b''.join(self._buffer)
+        self._buffer.clear()
+
+        if self._executor is None:
+            # 只用一个线程，保证写入按顺序进行
+            self._executor = ThreadPoolExecutor(1, thread_name_prefix='pyqqbot-recorder')
+
+        future = self._executor.submit(self._write_chunk, chunk)
+        future.add_done_callback(self._check_write)
+
+        if wait:
+            future.result()
+
+    @staticmethod
+    def _check_write(future: Future):
+        if future.exception() is not None:
+            EventLogger.error(f'写入录制日志失败: {future.exception()!r}')
+
+    def _write_chunk(self, chunk: bytes):
+        if self._file is None:
+            self._open()
+
+        self._file.write(chunk)
+        self._file.flush()
+        self._written += len(chunk)
+
+        if self._written >= self.max_bytes:
+            self._rotate()
+
+    def close(self):
+        self.flush()
+
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _open(self):
+        # 文件名包含完整的纳秒时间戳，同一秒内轮转的文件也能按名称排序；时钟回拨时保持递增
+        self._opened_ns = max(time.time_ns(), self._opened_ns + 1)
+        opened_at = time.strftime('%Y%m%d-%H%M%S', time.localtime(self._opened_ns / 1e9))
+        filename = f'{FILE_PREFIX}{opened_at}-{self._opened_ns:019d}{FILE_SUFFIX}'
+        self._file = gzip.open(os.path.join(self.directory, filename), 'wb', compresslevel=self.compresslevel)
+        self._written = 0
+
+    def _rotate(self):
+        self._file.close()
+        self._file = None
+
+        logs = list_logs(self.directory)
+        for path in logs[:max(len(logs) - self.backup_count, 0)]:
+            os.remove(path)
+
+
+def list_logs(directory: str) -> List[str]:
+    """
+    按时间顺序列出目录中的录制日志
+    :param directory:
+    :return:
+    """
+    return sorted(
+        os.path.join(directory, name) for name in os.listdir(directory)
+        if name.startswith(FILE_PREFIX) and name.endswith(FILE_SUFFIX)
+    )
+
+
+def read_frames(paths: Union[str, List[str]]) -> Iterator[Tuple[float, bytes]]:
+    """
+    读取录制日志，返回 (接收时间, 原始帧)
+    :param paths: 日志目录或日志文件列表
+    :return:
+    """
+    if isinstance(paths, str):
+        paths = list_logs(paths) if os.path.isdir(paths) else [paths]
+
+    for path in paths:
+        with gzip.open(path, 'rb') as f:
+            try:
+                for line in f:
+                    timestamp, _, data = line.rstrip(b'\n').partition(b'\t')
+                    yield float(timestamp), data
+            except EOFError:
+                # 进程异常退出时最后一个文件可能不完整
+                EventLogger.warn(f'录制日志不完整: {path}')
+
+
+class Replayer:
+    """
+    回放录制的网关流量，经由 register_event 与事件消费者处理，用于离线压测与复现问题
+    """
+    client: Any
+    speed: float
+
+    def __init__(self, client: Any, paths: Union[str, List[str]], speed: float = 1.0):
+        """
+        :param client: QQBot
+        :param paths: 日志目录或日志文件列表
+        :param speed: 回放倍速，1 为原速，0 为不等待尽快回放
+        """
+        self.client = client
+        self.paths = paths
+        self.speed = speed
+
+    async def run(self) -> int:
+        """
+        回放全部事件，并等待事件消费者取出所有事件
+        :return: 回放的事件数
+        """
+        if not self.client.queues:
+            self.client.start_consumers()
+
+        # 同一客户端多次回放同一份日志时，上一次回放的事件 ID 仍在去重索引中
+        self.client.dedupe.clear()
+
+        loop = asyncio.get_running_loop()
+        count = 0
+        origin = started = None
+
+        for timestamp, data in read_frames(self.paths):
+            load = self.client.frame_class.parse_raw(data)
+            if load.op != OpCode.Dispatch:
+                continue
+
+            if self.speed:
+                if origin is None:
+                    origin, started = timestamp, loop.time()
+
+                delay = started + (timestamp - origin) / self.speed - loop.time()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+
+            await self.client.register_event(load)
+            count += 1
+
+        for queue in self.client.queues:
+            await queue.join()
+
+        return count
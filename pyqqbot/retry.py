@@ -0,0 +1,119 @@
+from typing import Optional
+
+import random
+import time
+
+
+class CircuitOpenError(Exception):
+    """
+    接口熔断中，请求未发出
+    """
+    def __init__(self, route: str, retry_after: float):
+        super().__init__(f'circuit open for {route}, retry after {retry_after:.1f}s')
+        self.route = route
+        self.retry_after = retry_after
+
+
+class RetryPolicy:
+    """
+    失败重试策略，使用带随机抖动的指数退避
+    """
+    retries: int
+    base_delay: float
+    max_delay: float
+
+    def __init__(self, retries: int = 3, base_delay: float = 0.5, max_delay: float = 10,
+                 statuses: tuple = (429, 500, 502, 503, 504)):
+        """
+        :param retries: 最大重试次数
+        :param base_delay: 首次重试的最大等待时间
+        :param max_delay: 单次重试的最大等待时间
+        :param statuses: 需要重试的 HTTP 状态码
+        """
+        self.retries = retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.statuses = statuses
+
+    def delay(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        """
+        计算第 attempt 次重试前的等待时间，服务端给出 Retry-After 时以其为准
+        :param attempt: 从 0 开始
+        :param retry_after:
+        :return:
+        """
+        if retry_after is not None:
+            return min(retry_after, self.max_delay)
+
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+
+class CircuitBreaker:
+    """
+    熔断器，连续失败达到阈值后在一段时间内拒绝请求，之后仅放行一个试探请求
+    """
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    failure_threshold: int
+    recovery_timeout: float
+
+    def __init__(self, failure_threshold: int = 5, recovery_timeout: float = 30):
+        """
+        :param failure_threshold: 连续失败多少次后熔断
+        :param recovery_timeout: 熔断持续时间（秒）
+        """
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+
+        self.state = self.CLOSED
+        self.failures = 0
+
+        self._opened_at = 0.0
+        self._trial = False
+
+    def retry_after(self) -> float:
+        return max(0.0, self._opened_at + self.recovery_timeout - time.monotonic())
+
+    def allow(self) -> bool:
+        if self.state == self.CLOSED:
+            return True
+
+        if self.state == self.OPEN:
+            if self.retry_after() > 0:
+                return False
+            self.state = self.HALF_OPEN
+
+        # 半开状态下同时只放行一个试探请求
+        if self._trial:
+            return False
+
+        self._trial = True
+        return True
+
+    def release(self):
+        """
+        试探请求未得到结果（例如被取消）时，允许下一个请求继续试探
+        """
+        self._trial = False
+
+    def record_success(self):
+        self.state = self.CLOSED
+        self.failures = 0
+        self._trial = False
+
+    def record_failure(self):
+        self.failures += 1
+        self._trial = False
+
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            self.state = self.OPEN
+            self._opened_at = time.monotonic()
+
+    def snapshot(self) -> dict:
+        return {
+            'state': self.state,
+            'failures': self.failures,
+            'retry_after': self.retry_after() if self.state == self.OPEN else 0.0,
+        }
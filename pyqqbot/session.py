@@ -0,0 +1,244 @@
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+import threading
+import weakref
+import sqlite3
+import time
+import json
+import os
+
+from .logger import Session
+
+
+class SessionState(NamedTuple):
+    """
+    分片的网关会话，用于进程重启后 Resume
+    """
+    session_id: str
+    seq: int
+    gateway_url: str
+    shard_count: int
+    updated_at: float
+
+
+class SessionStore:
+    """
+    网关会话存储，写入先进入内存，按时间间隔批量落盘；落盘在单独的线程中依次进行，不阻塞事件循环。
+    子类实现 _read 与 _write
+    """
+    flush_interval: float
+    max_age: float
+
+    def __init__(self, flush_interval: float = 1.0, max_age: float = 600):
+        """
+        :param flush_interval: 批量写入的最长间隔（秒），进程异常退出时最多丢失这段时间内的序号，Resume 后会重复收到这些事件
+        :param max_age: 超过该时间（秒）未更新的会话视为已失效，不再尝试 Resume
+        """
+        self.flush_interval = flush_interval
+        self.max_age = max_age
+
+        # (app_id, shard_id) -> 会话，None 表示删除
+        self._pending: Dict[Tuple[int, int], Optional[SessionState]] = {}
+        self._flushed_at = time.monotonic()
+
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+        # fork 出的工作进程不会继承线程，也不能使用父进程的锁与数据库连接
+        store = weakref.ref(self)
+        os.register_at_fork(
+            before=lambda: store() is not None and store()._before_fork(),
+            after_in_parent=lambda: store() is not None and store()._after_fork_parent(),
+            after_in_child=lambda: store() is not None and store()._after_fork(),
+        )
+
+    def load(self, app_id: int) -> Dict[int, SessionState]:
+        """
+        读取仍然有效的会话
+        :param app_id:
+        :return: 分片 ID -> 会话
+        """
+        now = time.time()
+        return {
+            shard_id: state for shard_id, state in self._read(app_id).items()
+            if now - state.updated_at <= self.max_age
+        }
+
+    def save(self, app_id: int, shard_id: int, state: SessionState):
+        self._pending[app_id, shard_id] = state
+
+        if time.monotonic() - self._flushed_at >= self.flush_interval:
+            self.flush(wait=False)
+
+    def delete(self, app_id: int, shard_id: int):
+        self._pending[app_id, shard_id] = None
+        self.flush(wait=False)
+
+    def flush(self, wait: bool = True):
+        """
+        写入暂存的修改
+        :param wait: 是否等待写入完成，为 False 时在后台线程中写入后立即返回
+        :return:
+        """
+        self._flushed_at = time.monotonic()
+        if not self._pending:
+            return
+
+        pending, self._pending = self._pending, {}
+        future = self._get_executor().submit(self._write, pending)
+        future.add_done_callback(self._check_write)
+
+        if wait:
+            future.result()
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        # 只用一个线程，保证写入按顺序进行
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(1, thread_name_prefix='pyqqbot-session')
+        return self._executor
+
+    def _before_fork(self):
+        pass
+
+    def _after_fork_parent(self):
+        pass
+
+    def _after_fork(self):
+        self._executor = None
+
+    @staticmethod
+    def _check_write(future: Future):
+        if future.exception() is not None:
+            Session.error(f'保存网关会话失败: {future.exception()!r}')
+
+    def close(self):
+        self.flush()
+
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def _read(self, app_id: int) -> Dict[int, SessionState]:
+        raise NotImplementedError
+
+    def _write(self, changes: Dict[Tuple[int, int], Optional[SessionState]]):
+        raise NotImplementedError
+
+
+class FileSessionStore(SessionStore):
+    """
+    以 JSON 文件保存会话，写入时先写临时文件再替换，进程崩溃时不会留下损坏的文件。
+    只适用于单进程：读取、修改、写回之间没有加锁，多个工作进程同时写入会覆盖彼此的分片，
+    多进程运行（workers > 1）时请使用 SqliteSessionStore
+    """
+    path: str
+
+    def __init__(self, path: str, flush_interval: float = 1.0, max_age: float = 600):
+        super().__init__(flush_interval, max_age)
+        self.path = path
+
+    def _load_file(self) -> dict:
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    def _read(self, app_id: int) -> Dict[int, SessionState]:
+        states = {}
+        for key, value in self._load_file().items():
+            app, _, shard_id = key.partition(':')
+            if app == str(app_id):
+                states[int(shard_id)] = SessionState(**value)
+
+        return states
+
+    def _write(self, changes: Dict[Tuple[int, int], Optional[SessionState]]):
+        data = self._load_file()
+        for (app_id, shard_id), state in changes.items():
+            if state is None:
+                data.pop(f'{app_id}:{shard_id}', None)
+            else:
+                data[f'{app_id}:{shard_id}'] = state._asdict()
+
+        temp = f'{self.path}.{os.getpid()}.tmp'
+        with open(temp, 'w', encoding='utf-8') as f:
+            json.dump(data, f)
+        os.replace(temp, self.path)
+
+
+class SqliteSessionStore(SessionStore):
+    """
+    以 sqlite 数据库保存会话，可以由多个工作进程共用。
+    数据库连接在首次使用时打开，fork 出的工作进程会各自重新连接，sqlite 连接不能跨 fork 使用
+    """
+    path: str
+
+    def __init__(self, path: str, flush_interval: float = 1.0, max_age: float = 600):
+        super().__init__(flush_interval, max_age)
+        self.path = path
+
+        self._connection: Optional[sqlite3.Connection] = None
+        self._inherited: List[sqlite3.Connection] = []
+        # 读取在事件循环线程中进行，写入在后台线程中进行
+        self._lock = threading.Lock()
+
+    @property
+    def _db(self) -> sqlite3.Connection:
+        if self._connection is None:
+            self._connection = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+
+            self._connection.execute('PRAGMA journal_mode=WAL')
+            self._connection.execute('PRAGMA synchronous=NORMAL')
+            self._connection.execute(
+                'CREATE TABLE IF NOT EXISTS sessions ('
+                'app_id INTEGER, shard_id INTEGER, session_id TEXT, seq INTEGER, gateway_url TEXT, '
+                'shard_count INTEGER, updated_at REAL, PRIMARY KEY (app_id, shard_id))'
+            )
+
+        return self._connection
+
+    def _read(self, app_id: int) -> Dict[int, SessionState]:
+        with self._lock:
+            rows = self._db.execute(
+                'SELECT shard_id, session_id, seq, gateway_url, shard_count, updated_at FROM sessions WHERE app_id = ?',
+                (app_id,)
+            ).fetchall()
+        return {row[0]: SessionState(*row[1:]) for row in rows}
+
+    def _write(self, changes: Dict[Tuple[int, int], Optional[SessionState]]):
+        with self._lock, self._db as db:
+            db.execute('BEGIN')
+            db.executemany(
+                'DELETE FROM sessions WHERE app_id = ? AND shard_id = ?',
+                [key for key, state in changes.items() if state is None]
+            )
+            db.executemany(
+                'INSERT OR REPLACE INTO sessions VALUES (?, ?, ?, ?, ?, ?, ?)',
+                [(*key, *state) for key, state in changes.items() if state is not None]
+            )
+
+    def close(self):
+        super().close()
+
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+    def _before_fork(self):
+        # 写入线程在 sqlite 内部持有的互斥锁会被子进程继承且永远不会释放，等待正在进行的读写完成后再 fork
+        self._lock.acquire()
+
+    def _after_fork_parent(self):
+        self._lock.release()
+
+    def _after_fork(self):
+        super()._after_fork()
+
+        # 从父进程继承的连接不能使用也不能关闭，关闭时 sqlite 可能检查点并删除父进程仍在使用的 WAL 文件，
+        # 因此保留引用直到进程退出
+        if self._connection is not None:
+            self._inherited.append(self._connection)
+        self._connection = None
+        self._lock = threading.Lock()
@@ -0,0 +1,15 @@
+"""
+测试工具，建议直接从子模块导入：
+
+    from pyqqbot.testing.server import FakeServer
+
+包内不预先导入 server，否则 python -m pyqqbot.testing.server 运行时 runpy 会发出重复导入的警告
+"""
+
+
+def __getattr__(name: str):
+    if name in ('FakeServer', 'FakeSession'):
+        from . import server
+        return getattr(server, name)
+
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
@@ -0,0 +1,319 @@
+"""
+本地模拟的网关与 OpenAPI 服务器，用于在无网络环境下进行端到端压测
+
+    python -m pyqqbot.testing.server --port 8080 --rate 100
+"""
+from collections import deque
+from typing import Deque, Dict, List, Optional, Set, Tuple
+
+import argparse
+import asyncio
+import random
+import time
+import uuid
+import json
+
+from aiohttp import web, WSMsgType
+
+from ..models.ws import OpCode
+from ..logger import Network
+
+
+class FakeSession:
+    """
+    模拟的网关会话，保存最近的事件用于 Resume 补发
+    """
+    session_id: str
+    shard: List[int]
+
+    def __init__(self, shard: List[int], history: int):
+        self.session_id = str(uuid.uuid4())
+        self.shard = shard
+        self.s = 0
+        self.history: Deque[Tuple[int, str, str, dict]] = deque(maxlen=history)
+        self.ws: Optional[web.WebSocketResponse] = None
+
+
+class FakeServer:
+    """
+    模拟的 QQ 机器人服务端：
+    签发接口凭证，提供 /gateway 与 /gateway/bot，支持 Hello/Identify/Dispatch/Heartbeat/Resume 等操作码，
+    接收消息发送与富媒体上传请求，并可注入延迟、429 与断线
+    """
+    host: str
+    port: int
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 8080, shards: int = 1, heartbeat_interval: int = 41250,
+                 latency: float = 0, error_rate: float = 0, history: int = 1000):
+        """
+        :param host:
+        :param port:
+        :param shards: /gateway/bot 推荐的分片数
+        :param heartbeat_interval: 心跳间隔（毫秒）
+        :param latency: 每个 HTTP 请求增加的延迟（秒）
+        :param error_rate: HTTP 请求返回 429 的概率
+        :param history: 每个会话保存的事件数，用于 Resume 补发
+        """
+        self.host = host
+        self.port = port
+        self.shards = shards
+        self.heartbeat_interval = heartbeat_interval
+        self.latency = latency
+        self.error_rate = error_rate
+        self.history = history
+
+        self.tokens: Set[str] = set()
+        self.sessions: Dict[str, FakeSession] = {}
+        self.messages: List[Tuple[str, dict]] = []
+        self.uploaded_bytes = 0
+        self.heartbeats = 0
+
+        self._runner: Optional[web.AppRunner] = None
+        self._next = 0
+        # 模拟半开连接：不再回应心跳，也不再下发事件
+        self._stalled: Set[web.WebSocketResponse] = set()
+        # 由服务器主动关闭的连接，客户端回应的关闭码总是 1000，不代表客户端正常关闭
+        self._kicked: Set[web.WebSocketResponse] = set()
+
+        self.app = web.Application(client_max_size=1024 ** 3, middlewares=[self._faults])
+        self.app.add_routes([
+            web.post('/app/getAppAccessToken', self._access_token),
+            web.get('/gateway', self._gateway),
+            web.get('/gateway/bot', self._gateway_bot),
+            web.get('/websocket', self._websocket),
+            web.post('/v2/groups/{openid}/messages', self._message),
+            web.post('/v2/users/{openid}/messages', self._message),
+            web.post('/channels/{channel_id}/messages', self._message),
+            web.post('/dms/{guild_id}/messages', self._message),
+            web.post('/v2/groups/{openid}/files', self._upload),
+            web.post('/v2/users/{openid}/files', self._upload),
+        ])
+
+    @property
+    def url(self) -> str:
+        return f'http://{self.host}:{self.port}'
+
+    @property
+    def token_url(self) -> str:
+        return f'{self.url}/app/getAppAccessToken'
+
+    async def start(self):
+        self._runner = web.AppRunner(self.app)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+        Network.info(f'模拟服务器已启动: {self.url}')
+
+    async def stop(self):
+        for session in self.sessions.values():
+            if session.ws is not None:
+                await session.ws.close()
+
+        if self._runner is not None:
+            await self._runner.cleanup()
+
+    @web.middleware
+    async def _faults(self, request: web.Request, handler):
+        if request.path == '/websocket':
+            return await handler(request)
+
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+        if self.error_rate and random.random() < self.error_rate:
+            return web.json_response({'message': 'too many requests'}, status=429, headers={'Retry-After': '1'})
+
+        if request.path != '/app/getAppAccessToken':
+            token = request.headers.get('Authorization', '').removeprefix('QQBot ')
+            if token not in self.tokens:
+                return web.json_response({'message': 'invalid token'}, status=401)
+
+        return await handler(request)
+
+    async def _access_token(self, request: web.Request):
+        token = uuid.uuid4().hex
+        self.tokens.add(token)
+        return web.json_response({'access_token': token, 'expires_in': '7200'})
+
+    async def _gateway(self, request: web.Request):
+        return web.json_response({'url': f'ws://{self.host}:{self.port}/websocket'})
+
+    async def _gateway_bot(self, request: web.Request):
+        return web.json_response({
+            'url': f'ws://{self.host}:{self.port}/websocket',
+            'shards': self.shards,
+            'session_start_limit': {'total': 1000, 'remaining': 1000, 'reset_after': 86400000, 'max_concurrency': 1},
+        })
+
+    async def _message(self, request: web.Request):
+        data = await request.json()
+        self.messages.append((request.path, data))
+        return web.json_response({
+            'id': uuid.uuid4().hex,
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S+08:00'),
+        })
+
+    async def _upload(self, request: web.Request):
+        size = 0
+        async for chunk in request.content.iter_chunked(64 * 1024):
+            size += len(chunk)
+        self.uploaded_bytes += size
+
+        return web.json_response({'file_uuid': uuid.uuid4().hex, 'file_info': uuid.uuid4().hex, 'ttl': 3600})
+
+    async def _websocket(self, request: web.Request):
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        await ws.send_json({'op': OpCode.Hello, 'd': {'heartbeat_interval': self.heartbeat_interval}})
+
+        session = None
+        async for msg in ws:
+            if msg.type != WSMsgType.TEXT:
+                continue
+
+            load = json.loads(msg.data)
+            op, d = load.get('op'), load.get('d')
+
+            if op == OpCode.Heartbeat:
+                self.heartbeats += 1
+                if ws not in self._stalled:
+                    await ws.send_json({'op': OpCode.HeartbeatAck})
+            elif op == OpCode.Identify:
+                if d.get('token', '').removeprefix('QQBot ') not in self.tokens:
+                    await ws.send_json({'op': OpCode.InvalidSession, 'd': False})
+                    break
+
+                session = FakeSession(d.get('shard', [0, 1]), self.history)
+                session.ws = ws
+                self.sessions[session.session_id] = session
+                await self._send(session, 'READY', {
+                    'version': 1,
+                    'session_id': session.session_id,
+                    'user': {'id': '1234', 'username': 'pyqqbot', 'bot': True, 'status': 1},
+                    'shard': session.shard,
+                })
+            elif op == OpCode.Resume:
+                session = self.sessions.get(d.get('session_id'))
+                if session is None:
+                    await ws.send_json({'op': OpCode.InvalidSession, 'd': False})
+                    break
+
+                session.ws = ws
+                for s, t, event_id, data in list(session.history):
+                    if s > d.get('seq', 0):
+                        await ws.send_json({'op': OpCode.Dispatch, 's': s, 't': t, 'id': event_id, 'd': data})
+                await self._send(session, 'RESUMED', {})
+
+        if session is not None and session.ws is ws:
+            session.ws = None
+            # 与真实网关一致，客户端以 1000 正常关闭后会话失效，不能再 Resume
+            if ws.close_code == 1000 and ws not in self._kicked:
+                self.sessions.pop(session.session_id, None)
+        self._stalled.discard(ws)
+        self._kicked.discard(ws)
+
+        return ws
+
+    async def _send(self, session: FakeSession, t: str, d: dict):
+        session.s += 1
+        # 事件 ID 全局唯一，补发时保持不变；与真实网关一致，READY 与 RESUMED 不带事件 ID
+        event_id = None if t in ('READY', 'RESUMED') else f'{t}:{uuid.uuid4().hex}'
+        session.history.append((session.s, t, event_id, d))
+
+        if session.ws is not None and not session.ws.closed and session.ws not in self._stalled:
+            await session.ws.send_json({'op': OpCode.Dispatch, 's': session.s, 't': t, 'id': event_id, 'd': d})
+
+    def _connected(self) -> List[FakeSession]:
+        return [session for session in self.sessions.values() if session.ws is not None and not session.ws.closed]
+
+    async def dispatch(self, t: str, d: dict, shard: Optional[int] = None):
+        """
+        下发事件，未指定分片时轮流发送给各个会话；会话断开期间的事件会在 Resume 时补发
+        :param t: 事件名称
+        :param d: 事件数据
+        :param shard:
+        :return:
+        """
+        sessions = list(self.sessions.values())
+        if shard is not None:
+            sessions = [session for session in sessions if session.shard[0] == shard]
+        if not sessions:
+            return
+
+        self._next += 1
+        await self._send(sessions[self._next % len(sessions)], t, d)
+
+    async def generate(self, t: str, d: dict, rate: float, count: Optional[int] = None):
+        """
+        以固定速率持续下发事件
+        :param t:
+        :param d:
+        :param rate: 每秒事件数
+        :param count: 事件总数，为空时不限
+        :return:
+        """
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        sent = 0
+
+        while count is None or sent < count:
+            await self.dispatch(t, d)
+            sent += 1
+
+            delay = started + sent / rate - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+    async def disconnect(self, code: int = 4009):
+        """
+        断开所有连接，默认使用可以 Resume 的关闭码
+        :param code:
+        :return:
+        """
+        for session in self._connected():
+            self._kicked.add(session.ws)
+            await session.ws.close(code=code)
+
+    def stall(self):
+        """
+        让当前所有连接变为半开状态：连接不断开，但不再回应心跳，也不再下发事件，事件会在 Resume 时补发
+        """
+        self._stalled.update(session.ws for session in self._connected())
+
+    async def reconnect(self):
+        """
+        要求所有连接重连
+        """
+        for session in self._connected():
+            await session.ws.send_json({'op': OpCode.Reconnect})
+
+
+async def main():
+    from ..bench.samples import GROUP_AT_MESSAGE_CREATE
+
+    parser = argparse.ArgumentParser(description='本地模拟 QQ 机器人网关与 OpenAPI')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--shards', type=int, default=1)
+    parser.add_argument('--latency', type=float, default=0, help='每个 HTTP 请求增加的延迟（秒）')
+    parser.add_argument('--error-rate', type=float, default=0, help='HTTP 请求返回 429 的概率')
+    parser.add_argument('--rate', type=float, default=0, help='每秒下发的群聊消息事件数')
+    parser.add_argument('--disconnect-interval', type=float, default=0, help='定时断开连接的间隔（秒）')
+    args = parser.parse_args()
+
+    server = FakeServer(args.host, args.port, args.shards, latency=args.latency, error_rate=args.error_rate)
+    await server.start()
+
+    if args.rate:
+        asyncio.create_task(server.generate('GROUP_AT_MESSAGE_CREATE', GROUP_AT_MESSAGE_CREATE, args.rate))
+
+    while True:
+        await asyncio.sleep(args.disconnect_interval or 3600)
+        if args.disconnect_interval:
+            await server.disconnect()
+
+
+if __name__ == '__main__':
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,156 @@
+from typing import Any, Dict, Optional, Tuple
+
+import threading
+import traceback
+import asyncio
+import time
+import sys
+
+from .logger import Event as EventLogger
+
+
+def coroutine_stack(coro) -> str:
+    """
+    沿 cr_await 展开挂起中的协程调用链，Task.get_stack 只能取到最外层的帧
+    :param coro:
+    :return:
+    """
+    frames = []
+    while coro is not None:
+        frame = getattr(coro, 'cr_frame', None) or getattr(coro, 'gi_frame', None)
+        if frame is None:
+            break
+
+        frames.append((frame, frame.f_lineno))
+        coro = getattr(coro, 'cr_await', None) or getattr(coro, 'gi_yieldfrom', None)
+
+    return ''.join(traceback.format_list(traceback.StackSummary.extract(iter(frames))))
+
+
+class Watchdog:
+    """
+    事件循环看门狗：
+    在事件循环中定时调度以测量调度延迟，并检查运行时间过长的监听器；
+    另开一个线程检查事件循环是否被阻塞，阻塞时记录事件循环线程的堆栈与正在运行的监听器
+    """
+    interval: float
+    block_threshold: float
+    slow_threshold: float
+
+    def __init__(self, interval: float = 0.1, block_threshold: float = 0.5, slow_threshold: float = 30):
+        """
+        :param interval: 检查间隔（秒）
+        :param block_threshold: 事件循环阻塞多久后记录堆栈（秒）
+        :param slow_threshold: 监听器运行多久后视为过慢（秒），包括等待网络请求的时间
+        """
+        self.interval = interval
+        self.block_threshold = block_threshold
+        self.slow_threshold = slow_threshold
+
+        self.lag = 0.0
+        self.max_lag = 0.0
+
+        self.client: Any = None
+
+        # 监听器任务 -> (事件名称, 监听器名称, 开始时间)
+        self._handlers: Dict[asyncio.Task, Tuple[str, str, float]] = {}
+        self._beat = time.monotonic()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+
+    def start(self, client: Any):
+        """
+        在事件循环中启动看门狗
+        :param client: QQBot
+        :return:
+        """
+        self.client = client
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread = threading.get_ident()
+        self._beat = time.monotonic()
+        self._stopped.clear()
+
+        self._task = asyncio.create_task(self._monitor())
+        self._thread = threading.Thread(target=self._watch, name='pyqqbot-watchdog', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def track(self, task: asyncio.Task, event_name: str, handler: str):
+        """
+        记录正在运行的监听器任务，已完成的任务在下次检查时移除
+        :param task:
+        :param event_name:
+        :param handler:
+        :return:
+        """
+        if self._task is not None:
+            self._handlers[task] = (event_name, handler, time.monotonic())
+
+    async def _monitor(self):
+        while True:
+            started = time.monotonic()
+            await asyncio.sleep(self.interval)
+
+            now = self._beat = time.monotonic()
+            self.lag = max(now - started - self.interval, 0.0)
+            self.max_lag = max(self.max_lag, self.lag)
+            self.client.metrics.loop_lag.observe(self.lag)
+
+            if self.lag >= self.block_threshold:
+                EventLogger.warn(f'事件循环阻塞了 {self.lag:.3f}s')
+
+            self._check_handlers(now)
+
+    def _check_handlers(self, now: float):
+        for task, (event_name, handler, started) in list(self._handlers.items()):
+            if task.done():
+                del self._handlers[task]
+                continue
+
+            elapsed = now - started
+            if elapsed < self.slow_threshold:
+                continue
+
+            # 每个任务只报告一次
+            del self._handlers[task]
+            self.client.metrics.slow_handlers.labels(event_name, handler).inc()
+            EventLogger.warn(
+                f'监听器 {handler} 处理事件 {event_name} 已运行 {elapsed:.1f}s，当前位置:\n'
+                f'{coroutine_stack(task.get_coro())}'
+            )
+
+    def _watch(self):
+        """
+        看门狗线程，事件循环长时间没有更新心跳时记录事件循环线程的堆栈
+        """
+        reported = None
+
+        while not self._stopped.wait(self.interval):
+            beat = self._beat
+            blocked = time.monotonic() - beat - self.interval
+            if blocked < self.block_threshold or reported == beat:
+                continue
+
+            # 同一次阻塞只报告一次
+            reported = beat
+            self.client.metrics.loop_blocks.inc()
+
+            frame = sys._current_frames().get(self._loop_thread)
+            stack = ''.join(traceback.format_stack(frame)) if frame is not None else ''
+
+            handler = None
+            task = asyncio.current_task(self._loop)
+            if task is not None:
+                handler = self._handlers.get(task)
+
+            where = f'监听器 {handler[1]} 处理事件 {handler[0]} 时' if handler else ''
+            EventLogger.error(f'{where}事件循环已阻塞 {blocked:.3f}s，事件循环线程堆栈:\n{stack}')
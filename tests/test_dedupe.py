@@ -0,0 +1,51 @@
+from pyqqbot.dedupe import DedupeIndex, dedupe_key
+from pyqqbot.models.ws import Load
+
+
+def test_seen_within_window():
+    index = DedupeIndex(capacity=10, window=60)
+    assert not index.seen('a', now=0)
+    assert index.seen('a', now=1)
+    assert index.duplicates == 1
+
+
+def test_expire_after_window():
+    index = DedupeIndex(capacity=10, window=60)
+    index.seen('a', now=0)
+    index.seen('b', now=30)
+
+    assert not index.seen('a', now=61)
+    assert index.seen('b', now=61)
+    assert len(index) == 2
+
+
+def test_evict_oldest_when_full():
+    index = DedupeIndex(capacity=3, window=60)
+    for key in 'abcd':
+        assert not index.seen(key, now=0)
+
+    assert len(index) == 3
+    assert not index.seen('a', now=0)
+    assert index.seen('d', now=0)
+
+
+def test_zero_capacity_disables():
+    index = DedupeIndex(capacity=0)
+    assert not index.seen('a')
+    assert not index.seen('a')
+
+
+def test_clear():
+    index = DedupeIndex(capacity=10)
+    index.seen('a')
+    index.clear()
+    assert len(index) == 0
+    assert not index.seen('a')
+
+
+def test_dedupe_key():
+    assert dedupe_key(Load(op=0, s=1, t='GROUP_AT_MESSAGE_CREATE', id='E:1', d={'id': 'm'})) == 'E:1'
+    assert dedupe_key(Load(op=0, s=1, t='GROUP_AT_MESSAGE_CREATE', d={'id': 'm'})) == ('GROUP_AT_MESSAGE_CREATE', 'm')
+    # 非消息事件的 id 是实体 ID，不能用于去重
+    assert dedupe_key(Load(op=0, s=1, t='GUILD_UPDATE', d={'id': 'g'})) is None
+    assert dedupe_key(Load(op=0, s=1, t='READY', d={'session_id': 's'})) is None
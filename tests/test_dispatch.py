@@ -0,0 +1,71 @@
+import asyncio
+
+from pyqqbot.dispatch import EventQueue, OverflowPolicy
+from pyqqbot.event.models import Event
+
+
+def drain(queue: EventQueue) -> list:
+    names = []
+    while not queue.empty():
+        event = queue.get_nowait()
+        names.append(None if event is None else event.name)
+    return names
+
+
+async def fill(queue: EventQueue, *names: str):
+    for name in names:
+        await queue.put(Event(name, data={}))
+
+
+def test_drop_oldest():
+    async def main():
+        queue = EventQueue(2, OverflowPolicy.DROP_OLDEST)
+        await fill(queue, 'A', 'B', 'C')
+        return queue
+
+    queue = asyncio.run(main())
+    assert drain(queue) == ['B', 'C']
+    assert queue.dropped == {'drop_oldest': 1}
+    assert queue.dropped_events == {'A': 1}
+
+
+def test_drop_priority():
+    async def main():
+        queue = EventQueue(2, OverflowPolicy.DROP_PRIORITY, {'HIGH': 1})
+        await fill(queue, 'HIGH', 'LOW', 'HIGH')
+        # 新事件优先级最低时丢弃新事件
+        await fill(queue, 'LOW')
+        return queue
+
+    queue = asyncio.run(main())
+    assert drain(queue) == ['HIGH', 'HIGH']
+    assert queue.dropped_events == {'LOW': 2}
+
+
+def test_block():
+    async def main():
+        queue = EventQueue(1, OverflowPolicy.BLOCK)
+        await fill(queue, 'A')
+        put = asyncio.create_task(fill(queue, 'B'))
+        await asyncio.sleep(0)
+        assert not put.done()
+
+        assert queue.get_nowait().name == 'A'
+        await put
+        return queue
+
+    queue = asyncio.run(main())
+    assert drain(queue) == ['B']
+
+
+def test_close_keeps_stop_signal():
+    for policy in (OverflowPolicy.DROP_OLDEST, OverflowPolicy.DROP_PRIORITY):
+        async def main():
+            queue = EventQueue(1, policy)
+            queue.close()
+            await fill(queue, 'A', 'B')
+            return queue
+
+        queue = asyncio.run(main())
+        assert drain(queue) == [None]
+        assert not queue.dropped
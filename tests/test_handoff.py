@@ -0,0 +1,62 @@
+import asyncio
+import time
+
+from pyqqbot.handoff import HandoffServer, request_handoff
+from pyqqbot.session import SessionState
+
+
+class FakeShard:
+    def __init__(self, shard_id: int, state=None):
+        self.shard_id = shard_id
+        self.state = state
+
+    async def detach(self):
+        return self.state
+
+
+class FakeClient:
+    def __init__(self, shards):
+        self.shards = shards
+        self.closed = False
+
+    async def close(self):
+        self.closed = True
+
+
+def test_handoff(tmp_path):
+    path = str(tmp_path / 'handoff.sock')
+    state = SessionState('session', 42, 'wss://gateway', 2, time.time())
+    client = FakeClient([FakeShard(0, state), FakeShard(1)])
+
+    async def main():
+        server = HandoffServer(client, path)
+        await server.start()
+
+        states = await request_handoff(path, timeout=5)
+        await asyncio.wait_for(server.drained, 5)
+        return states
+
+    assert asyncio.run(main()) == {0: state}
+    assert client.closed
+    assert not (tmp_path / 'handoff.sock').exists()
+
+
+def test_no_server(tmp_path):
+    assert asyncio.run(request_handoff(str(tmp_path / 'missing.sock'))) is None
+
+
+def test_bad_response(tmp_path):
+    path = str(tmp_path / 'handoff.sock')
+
+    async def reply(reader, writer):
+        await reader.readline()
+        writer.write(b'[]\n')
+        await writer.drain()
+        writer.close()
+
+    async def main():
+        server = await asyncio.start_unix_server(reply, path)
+        async with server:
+            return await request_handoff(path, timeout=5)
+
+    assert asyncio.run(main()) is None
@@ -0,0 +1,95 @@
+import multiprocessing
+import time
+import os
+
+import pytest
+
+from pyqqbot.session import FileSessionStore, SessionState, SqliteSessionStore
+
+
+@pytest.fixture(params=['json', 'sqlite'])
+def make_store(request, tmp_path):
+    def make(**kwargs):
+        if request.param == 'json':
+            return FileSessionStore(str(tmp_path / 'sessions.json'), **kwargs)
+        return SqliteSessionStore(str(tmp_path / 'sessions.db'), **kwargs)
+    return make
+
+
+def state(seq: int, updated_at: float = None) -> SessionState:
+    return SessionState('session', seq, 'wss://gateway', 2, time.time() if updated_at is None else updated_at)
+
+
+def test_round_trip(make_store):
+    store = make_store()
+    store.save(1, 0, state(10))
+    store.save(1, 1, state(20))
+    store.save(2, 0, state(30))
+    store.close()
+
+    store = make_store()
+    loaded = store.load(1)
+    assert {shard_id: s.seq for shard_id, s in loaded.items()} == {0: 10, 1: 20}
+    assert loaded[0] == store.load(1)[0]
+    store.close()
+
+
+def test_delete(make_store):
+    store = make_store()
+    store.save(1, 0, state(10))
+    store.save(1, 1, state(20))
+    store.flush()
+    store.delete(1, 0)
+    store.close()
+
+    store = make_store()
+    assert list(store.load(1)) == [1]
+    store.close()
+
+
+def test_pending_until_flush(make_store):
+    store = make_store(flush_interval=60)
+    store.save(1, 0, state(10))
+    reader = make_store()
+    assert reader.load(1) == {}
+
+    store.flush()
+    assert reader.load(1)[0].seq == 10
+    store.close()
+    reader.close()
+
+
+def test_expired(make_store):
+    store = make_store(max_age=60)
+    store.save(1, 0, state(10, time.time() - 120))
+    store.flush()
+    assert store.load(1) == {}
+    store.close()
+
+
+@pytest.mark.skipif(not hasattr(os, 'fork'), reason='需要 fork')
+def test_sqlite_fork(tmp_path):
+    path = str(tmp_path / 'sessions.db')
+    # 父进程的写入线程可能在 fork 时仍在写入
+    store = SqliteSessionStore(path, flush_interval=0)
+    store.save(1, 9, state(1))
+
+    def child(shard_id: int):
+        for seq in range(50):
+            store.save(1, shard_id, state(seq))
+        store.close()
+
+    context = multiprocessing.get_context('fork')
+    processes = [context.Process(target=child, args=(shard_id,), daemon=True) for shard_id in range(4)]
+    for process in processes:
+        process.start()
+
+    deadline = time.monotonic() + 20
+    for process in processes:
+        process.join(max(0.0, deadline - time.monotonic()))
+
+    assert [process.exitcode for process in processes] == [0] * 4
+    reader = SqliteSessionStore(path)
+    assert {shard_id: s.seq for shard_id, s in reader.load(1).items()} == {0: 49, 1: 49, 2: 49, 3: 49, 9: 1}
+    reader.close()
+    store.close()